@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import contextlib
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+import rich
+from rich.table import Table
+
+from benchmarks import fixture
+from tankensetto import extractors, util
+from tankensetto.assets import mon_sprites
+from tankensetto.constants.narc_path import NARCPath
+from tankensetto.tools.gfx import NativeGFX
+from tankensetto.tools.narc import NARCArchive, NativeNARC, UnpackedMembers
+from tankensetto.tools.nds import NATIVE_NDS
+
+# Module behind the `tankensetto` command, whose import time every invocation pays.
+CLI_MODULE = "tankensetto.tankensetto"
+
+
+class Stopwatch:
+    """
+    Collects the wall time of each named stage of a benchmark run.
+    """
+
+    def __init__(self) -> None:
+        self.stages: dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = time.perf_counter() - start
+
+
+def run_scale(root: pathlib.Path, scale: int, jobs: int) -> dict:
+    """
+    Time each stage of sprite extraction against a fixture with `scale` times the real member
+    counts.
+
+    The stages are driven through the same functions `mon_sprites.extract` uses, applied to every
+    member of the scaled archives rather than only those the real game has.
+    """
+    fx = fixture.build(root, scale)
+    rom_contents = root / "rom.nds_contents"
+    filesys = rom_contents / "filesys"
+    output = root / "output"
+
+    watch = Stopwatch()
+    with watch.stage("extract_rom"):
+        rom_files = extractors.rom_files([extractors.AssetExtractor.mon_sprites])
+        NATIVE_NDS.extract_files(fx.rom, rom_contents, rom_files, True)
+
+    narc = NativeNARC()
+    with watch.stage("unpack_narcs"):
+        members = {
+            np: UnpackedMembers(util.unpack_narc(narc, np, filesys, True, False), np.value.stem)
+            for np in mon_sprites.UNPACKS
+        }
+
+    with watch.stage("open_narcs"):
+        archives = {np: NARCArchive.load(filesys / np.value) for np in mon_sprites.OPENS}
+
+    sprite_sets = fx.species
+    dest_roots = [output / f"{i:06}" for i in range(sprite_sets)]
+    for dest_root in dest_roots:
+        dest_root.mkdir(parents=True)
+
+    with watch.stage("collect_jobs"):
+        jobs_list = [
+            job
+            for i, dest_root in enumerate(dest_roots)
+            for job in mon_sprites.sprite_jobs(members[NARCPath.pokegra], dest_root, i)
+        ]
+
+    with watch.stage("convert_sprites"):
+        NativeGFX().convert_batch(jobs_list, jobs)
+
+    with watch.stage("decode_sprite_data"):
+        mon_sprites.decode_sprite_data(
+            archives[NARCPath.height],
+            archives[NARCPath.poke_data][0],
+            sprite_sets,
+        )
+
+    with watch.stage("extract_mon_sprites"):
+        mon_sprites.extract(
+            NativeGFX(),
+            members,
+            archives,
+            {path: rom_contents / path for path in rom_files},
+            fx.project,
+            True,
+            jobs,
+            rom_contents / "conversions.json",
+        )
+
+    return {
+        "members": {np.name: len(NARCArchive.load(filesys / np.value)) for np in NARCPath},
+        "conversions": len(jobs_list),
+        "stages": watch.stages,
+    }
+
+
+def import_time(module: str, runs: int = 5) -> float:
+    """
+    Measure the time taken to import a module in a fresh interpreter, as reported by
+    `python -X importtime`, taking the best of several runs.
+    """
+    best = float("inf")
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=pathlib.Path(__file__).parent.parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        # Lines read "import time: <self us> | <cumulative us> | <module>", innermost first.
+        # Anything else on stderr, such as a warning, is skipped.
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+
+            (_, cumulative, name) = line.split("|")
+            if name.strip() == module:
+                best = min(best, int(cumulative) / 1_000_000)
+
+    return best
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    List the stages which ran more than `threshold` times slower than in the baseline.
+    """
+    regressions = []
+    for scale, result in results["scales"].items():
+        base_stages = baseline.get("scales", {}).get(scale, {}).get("stages", {})
+        for stage, seconds in result["stages"].items():
+            before = base_stages.get(stage)
+            if before and seconds > before * threshold:
+                regressions.append(f"{scale}x {stage}: {before:.3f}s -> {seconds:.3f}s")
+
+    return regressions
+
+
+def summarize(results: dict) -> Table:
+    scales = list(results["scales"])
+    table = Table(title="Benchmark (seconds)")
+    table.add_column("Stage")
+    for scale in scales:
+        table.add_column(f"{scale}x", justify="right")
+
+    for stage in results["scales"][scales[0]]["stages"]:
+        table.add_row(
+            stage,
+            *(f"{results['scales'][s]['stages'][stage]:.3f}" for s in scales),
+        )
+
+    return table
+
+
+@click.command()
+@click.help_option("-h", "--help")
+@click.option(
+    "--scales",
+    default="1,10,100",
+    help="Comma-separated multipliers on the ROM's archive member counts.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of worker processes to use for conversion.",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=pathlib.Path,
+    default=None,
+    help="If specified, write the results as JSON to this path.",
+)
+@click.option(
+    "--baseline",
+    type=pathlib.Path,
+    default=None,
+    help="Results from a previous run; exit non-zero if any stage regressed against them.",
+)
+@click.option(
+    "--threshold",
+    type=float,
+    default=1.25,
+    help="Ratio of time against the baseline beyond which a stage counts as regressed.",
+)
+@click.option(
+    "--import-budget",
+    type=float,
+    default=75.0,
+    help="Milliseconds the CLI may take to import; exit non-zero if it takes longer.",
+)
+def main(
+    scales: str,
+    jobs: int,
+    output: pathlib.Path | None,
+    baseline: pathlib.Path | None,
+    threshold: float,
+    import_budget: float,
+):
+    """
+    Benchmark each stage of sprite extraction against synthetic ROMs of increasing size.
+    """
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "jobs": jobs,
+        "import": import_time(CLI_MODULE),
+        "scales": {},
+    }
+
+    for scale in map(int, scales.split(",")):
+        rich.print(f"Benchmarking at [bold yellow]{scale}x[/]...")
+        with tempfile.TemporaryDirectory(prefix="tankensetto-bench-") as root:
+            results["scales"][str(scale)] = run_scale(pathlib.Path(root), scale, jobs)
+
+    rich.print(summarize(results))
+    rich.print(f"Importing {CLI_MODULE} took {results['import'] * 1000:.1f}ms")
+    if output:
+        output.write_text(json.dumps(results, indent=4), encoding="utf-8")
+
+    failures = []
+    if results["import"] * 1000 > import_budget:
+        failures.append(f"import {CLI_MODULE}: over the budget of {import_budget:.0f}ms")
+    if baseline:
+        failures.extend(
+            compare(results, json.loads(baseline.read_text(encoding="utf-8")), threshold)
+        )
+
+    for failure in failures:
+        rich.print(f"[bold red]✗[/] {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
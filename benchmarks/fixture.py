@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import array
+import dataclasses
+import json
+import pathlib
+import random
+import struct
+import sys
+
+from tankensetto.assets import mon_sprites
+from tankensetto.constants import pokemon
+from tankensetto.constants.narc_path import NARCPath
+
+# Number of files in the real pl_otherpoke.narc, and the highest alt form icon index.
+OTHERPOKE_COUNT = 253
+ALT_ICON_COUNT = 46
+
+SPRITE_WIDTH = 160
+SPRITE_HEIGHT = 80
+ICON_SIZE = 32
+
+
+def build_fnt(paths: list[str]) -> tuple[bytes, dict[str, int]]:
+    """
+    Build a NitroFS file name table for the given file paths.
+
+    Returns the table and the file ID assigned to each path.
+    """
+    tree: dict = {}
+    for path in paths:
+        *dirs, name = path.split("/")
+        node = tree
+        for d in dirs:
+            node = node.setdefault(d, {})
+        node[name] = None
+
+    nodes: list[tuple[dict, int]] = []
+
+    def walk(node: dict, parent: int):
+        nodes.append((node, parent))
+        index = len(nodes) - 1
+        for child in node.values():
+            if child is not None:
+                walk(child, index)
+
+    walk(tree, 0)
+    dir_ids = {id(node): i for i, (node, _) in enumerate(nodes)}
+
+    prefixes = {id(tree): ""}
+    for node, _ in nodes:
+        for name, child in node.items():
+            if child is not None:
+                prefixes[id(child)] = f"{prefixes[id(node)]}{name}/"
+
+    file_ids: dict[str, int] = {}
+    firsts = []
+    subtables = []
+    for node, _ in nodes:
+        firsts.append(len(file_ids))
+        sub = bytearray()
+        for name, child in node.items():
+            if child is None:
+                sub += bytes([len(name)]) + name.encode()
+                file_ids[prefixes[id(node)] + name] = len(file_ids)
+        for name, child in node.items():
+            if child is not None:
+                sub += bytes([0x80 | len(name)]) + name.encode()
+                sub += struct.pack("<H", 0xF000 | dir_ids[id(child)])
+        subtables.append(bytes(sub) + b"\x00")
+
+    main = bytearray()
+    body = bytearray()
+    for i, (_, parent) in enumerate(nodes):
+        third = len(nodes) if i == 0 else 0xF000 | parent
+        main += struct.pack("<IHH", 8 * len(nodes) + len(body), firsts[i], third)
+        body += subtables[i]
+
+    return (bytes(main + body), file_ids)
+
+
+def build_rom(files: dict[str, bytes], arm9: bytes) -> bytes:
+    """
+    Build an NDS image holding the given ARM9 binary and filesystem.
+    """
+    (fnt, file_ids) = build_fnt(sorted(files))
+    data = bytearray(0x4000)
+
+    def place(blob: bytes) -> int:
+        offset = len(data)
+        data.extend(blob)
+        data.extend(b"\xff" * (-len(data) % 0x200))
+        return offset
+
+    arm9_offset = place(arm9)
+    arm7 = b"\x07" * 0x40
+    arm7_offset = place(arm7)
+    fnt_offset = place(fnt)
+    fat = bytearray(8 * len(file_ids))
+    fat_offset = place(fat)
+    for path, file_id in sorted(file_ids.items(), key=lambda kv: kv[1]):
+        start = place(files[path])
+        struct.pack_into("<II", data, fat_offset + 8 * file_id, start, start + len(files[path]))
+
+    struct.pack_into(
+        "<16I",
+        data,
+        0x20,
+        arm9_offset,
+        0,
+        0x2000000,
+        len(arm9),
+        arm7_offset,
+        0,
+        0x2380000,
+        len(arm7),
+        fnt_offset,
+        len(fnt),
+        fat_offset,
+        len(fat),
+        0,
+        0,
+        0,
+        0,
+    )
+    data[0:16] = b"POKEMON PL\x00\x00CPUE"
+    return bytes(data)
+
+
+def build_narc(members: list[bytes]) -> bytes:
+    """
+    Build a NARC of the given members.
+
+    Identical members share their data in the file image, so archives with many repeated members
+    stay small while still holding one FAT entry per member.
+    """
+    image = bytearray()
+    fat = bytearray()
+    placed: dict[bytes, int] = {}
+    for member in members:
+        if member not in placed:
+            placed[member] = len(image)
+            image += member
+            image += b"\xff" * (-len(image) % 4)
+        start = placed[member]
+        fat += struct.pack("<II", start, start + len(member))
+
+    btaf = b"BTAF" + struct.pack("<IHH", 12 + len(fat), len(members), 0) + fat
+    btnf = b"BTNF" + struct.pack("<IIHH", 16, 4, 0, 1)
+    gmif = b"GMIF" + struct.pack("<I", 8 + len(image)) + image
+    body = btaf + btnf + gmif
+    return b"NARC" + struct.pack("<HHIHH", 0xFFFE, 0x0100, 16 + len(body), 16, 3) + body
+
+
+def nitro_file(magic: bytes, chunks: list[bytes]) -> bytes:
+    body = b"".join(chunks)
+    return magic + struct.pack("<HHIHH", 0xFEFF, 0x0100, 16 + len(body), 16, len(chunks)) + body
+
+
+def build_nclr(colors: list[int]) -> bytes:
+    data = struct.pack(f"<{len(colors)}H", *colors)
+    ttlp = b"TTLP" + struct.pack("<IIIII", 0x18 + len(data), 3, 0, len(data), 0x10) + data
+    return nitro_file(b"RLCN", [ttlp])
+
+
+def build_ncgr(data: bytes, rows: int, cols: int, scanned: bool = False) -> bytes:
+    header = struct.pack("<IhhIIIII", 0x20 + len(data), rows, cols, 3, 0, scanned, len(data), 0x18)
+    return nitro_file(b"RGCN", [b"RAHC" + header + data])
+
+
+def build_lbal(labels: list[str]) -> bytes:
+    offsets = bytearray()
+    strings = bytearray()
+    for label in labels:
+        offsets += struct.pack("<I", len(strings))
+        strings += label.encode() + b"\x00"
+
+    body = offsets + strings
+    body += b"\x00" * (-len(body) % 4)
+    return b"LBAL" + struct.pack("<I", 8 + len(body)) + body
+
+
+def build_ncer(labels: list[str]) -> bytes:
+    """
+    Build an NCER holding one extended cell of a single OAM.
+    """
+    cells = struct.pack("<HHI", 1, 0, 0) + struct.pack("<hhhh", 16, 16, -16, -16)
+    oam = struct.pack("<HHH", 0x80F0, 0x81F0, 0)
+    body = struct.pack("<HHIIIII", 1, 1, 0x18, 0, 0, 0, 0) + cells + oam
+    body += b"\x00" * (-len(body) % 4)
+    kbec = b"KBEC" + struct.pack("<I", 8 + len(body)) + body
+    return nitro_file(b"RECN", [kbec, build_lbal(labels)])
+
+
+def build_nanr(labels: list[str]) -> bytes:
+    """
+    Build an NANR holding one sequence of a single frame.
+    """
+    sequences = struct.pack("<HHHHII", 1, 0, 0, 1, 2, 0)
+    frames = struct.pack("<IHH", 0, 10, 0xBEEF)
+    results = struct.pack("<HH", 0, 0xCCCC)
+    seq_offset = 0x18
+    frame_offset = seq_offset + len(sequences)
+    result_offset = frame_offset + len(frames)
+    header = struct.pack("<HHIIIII", 1, 1, seq_offset, frame_offset, result_offset, 0, 0)
+    body = header + sequences + frames + results
+    knba = b"KNBA" + struct.pack("<I", 8 + len(body)) + body
+    return nitro_file(b"RNAN", [knba, build_lbal(labels)])
+
+
+def scramble(plain: bytes, seed: int) -> bytes:
+    """
+    Scramble character data as Platinum stores its Pokémon sprites; the inverse of the
+    descrambling done when converting them.
+    """
+    halves = array.array("H", plain)
+    key = seed
+    for i in range(len(halves)):
+        halves[i] ^= key & 0xFFFF
+        key = (key * 1103515245 + 24691) & 0xFFFFFFFF
+
+    return halves.tobytes()
+
+
+def sprite(rng: random.Random) -> bytes:
+    pixels = bytearray(rng.randbytes(SPRITE_WIDTH * SPRITE_HEIGHT // 2))
+    pixels[0:2] = b"\x00\x00"
+    data = scramble(bytes(pixels), rng.randrange(0x10000))
+    return build_ncgr(data, SPRITE_HEIGHT // 8, SPRITE_WIDTH // 8, scanned=True)
+
+
+def palette(rng: random.Random, count: int = 16) -> bytes:
+    return build_nclr([rng.randrange(0x8000) for _ in range(count)])
+
+
+def icon(rng: random.Random) -> bytes:
+    return build_ncgr(rng.randbytes(ICON_SIZE * ICON_SIZE), ICON_SIZE // 8, ICON_SIZE // 8)
+
+
+@dataclasses.dataclass
+class Fixture:
+    rom: pathlib.Path
+    project: pathlib.Path
+    scale: int
+
+    @property
+    def species(self) -> int:
+        """
+        Number of species' worth of records in each scaled table.
+        """
+        return pokemon.MAX_SPECIES * self.scale
+
+
+def build(root: pathlib.Path, scale: int = 1, seed: int = 0) -> Fixture:
+    """
+    Synthesize a Platinum-like ROM and a stub target project under the given directory.
+
+    The ROM's archives are laid out as NARCPath expects, with `scale` times as many members as the
+    real game. Only the first copy of each member is distinct; later copies reuse its data, so the
+    ROM stays small while unpacking and per-member work scales with the member count.
+
+    Arguments:
+    root -- directory in which to create the fixture
+    scale -- multiplier on the number of members in each archive
+    seed -- seed for the generated contents
+    """
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    species = pokemon.MAX_SPECIES
+
+    pokegra = []
+    for i in range(species):
+        # The first sprite of each species, and every sprite of SPECIES_NONE, is empty.
+        sprites = [b"" if i == 0 or k == 0 else sprite(rng) for k in range(4)]
+        pokegra.extend([*sprites, palette(rng), palette(rng)])
+
+    otherpoke = [sprite(rng) if i < 154 else palette(rng) for i in range(OTHERPOKE_COUNT)]
+    for i in (248, 249, 251):
+        otherpoke[i] = sprite(rng)
+
+    labels = ["CellAnime0"]
+    poke_icon = [
+        palette(rng, 48),
+        *[build_nanr(labels), build_ncer(labels)] * 3,
+        *[icon(rng) for _ in range(species + ALT_ICON_COUNT)],
+    ]
+
+    height = [bytes([rng.randrange(40)]) for _ in range(4 * species * scale)]
+    poke_data = bytearray(rng.randbytes(mon_sprites.POKE_DATA_RECORD.size * species * scale))
+    for i in range(species * scale):
+        poke_data[(i + 1) * mon_sprites.POKE_DATA_RECORD.size - 1] = rng.randrange(4)
+
+    files = {
+        NARCPath.pokegra.value.as_posix(): build_narc(pokegra * scale),
+        NARCPath.otherpoke.value.as_posix(): build_narc(otherpoke * scale),
+        NARCPath.height.value.as_posix(): build_narc(height),
+        NARCPath.poke_data.value.as_posix(): build_narc([bytes(poke_data)]),
+        NARCPath.poke_icon.value.as_posix(): build_narc(poke_icon * scale),
+    }
+
+    table_end = mon_sprites.ICON_PALETTE_TABLE_OFFSET + mon_sprites.ICON_PALETTE_TABLE_COUNT
+    arm9 = bytearray(table_end + 0x100)
+    for i in range(mon_sprites.ICON_PALETTE_TABLE_COUNT):
+        arm9[mon_sprites.ICON_PALETTE_TABLE_OFFSET + i] = rng.randrange(3)
+
+    rom = root / "rom.nds"
+    rom.write_bytes(build_rom(files, bytes(arm9)))
+
+    project = root / "project"
+    build_project(project)
+    return Fixture(rom, project, scale)
+
+
+def build_project(project: pathlib.Path):
+    """
+    Create the directories and files of a pokeplatinum checkout which mon_sprites expects to find.
+    """
+    res_pokemon = project / "res" / "pokemon"
+    blank_sprite_data = {"front": {"y_offset": {}}, "back": {"y_offset": {}}, "shadow": {}}
+    for species in pokemon.Species:
+        (res_pokemon / species).mkdir(parents=True, exist_ok=True)
+        (res_pokemon / species / "sprite_data.json").write_text(
+            json.dumps(blank_sprite_data, indent=4), encoding="utf-8"
+        )
+
+    for species, forms in mon_sprites.OTHERPOKE_FILES.items():
+        for form in forms:
+            (res_pokemon / species / "forms" / form).mkdir(parents=True, exist_ok=True)
+
+    (res_pokemon / "egg" / "forms" / "manaphy").mkdir(parents=True, exist_ok=True)
+    (res_pokemon / ".shared").mkdir(exist_ok=True)
+
+    include_data = project / "include" / "data"
+    include_data.mkdir(parents=True, exist_ok=True)
+    (include_data / "pokeicon_palettes.h").write_text(
+        "static const u8 sPokemonIconPaletteIndex[] = {\n};\n", encoding="utf-8"
+    )
+
+
+if __name__ == "__main__":
+    fixture = build(pathlib.Path(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else 1)
+    print(fixture.rom)
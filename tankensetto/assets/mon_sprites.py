@@ -17,20 +17,21 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import concurrent.futures
 import dataclasses
+import itertools
 import json
-import os
 import pathlib
-import shutil
+import typing
 
 import rich
 
-from tankensetto import info
+from tankensetto import cache, diff, extractors, info, manifest, outputs, tracing
 from tankensetto.constants import pokemon
-from tankensetto.constants import narc_path
 from tankensetto.constants.narc_path import NARCPath
+from tankensetto.formats import records
 from tankensetto.tools import gfx, narc
-from tankensetto.util import le_int, sint8, unpack_narcs
+from tankensetto.util import convert_batch
 
 
 @dataclasses.dataclass
@@ -44,6 +45,55 @@ class AltFormSpriteSet:
 
 MON_DIRS = list(pokemon.Species)
 
+# ROM files and archives this extractor converts from, and the project files it reads and writes.
+ROM_FILES = (pathlib.PurePath("arm9.bin"),)
+UNPACKS = (NARCPath.pokegra, NARCPath.otherpoke, NARCPath.poke_icon)
+OPENS = (NARCPath.height, NARCPath.poke_data)
+READS = (
+    pathlib.PurePath("res/pokemon"),
+    pathlib.PurePath("include/data/pokeicon_palettes.h"),
+)
+PRODUCES = READS
+
+# Per-species record of the sprite data table in pl_poke_data. Each sprite's animation is made of
+# 10 frames of (sprite frame, delay, x shift, y shift).
+POKE_DATA_RECORD = records.Layout(
+    ("front_cry_delay", "b"),
+    ("front_animation", "B"),
+    ("front_start_delay", "B"),
+    ("front_frames", "40b"),
+    ("back_cry_delay", "b"),
+    ("back_animation", "B"),
+    ("back_start_delay", "B"),
+    ("back_frames", "40b"),
+    ("front_addl_y_offset", "b"),
+    ("shadow_x_offset", "b"),
+    ("shadow_size", "B"),
+)
+
+# Per-species y offsets, one per member of the height archive.
+HEIGHT_RECORD = records.Layout(
+    ("female_back", "B"),
+    ("male_back", "B"),
+    ("female_front", "B"),
+    ("male_front", "B"),
+)
+
+# Icon palette index for each species and alt form icon, stored in arm9.
+ICON_PALETTE_RECORD = records.Layout(("palette", "B"))
+ICON_PALETTE_TABLE_OFFSET = 0xF0780
+ICON_PALETTE_TABLE_COUNT = 0x21C
+
+# Parts of ROM files, other than whole archives, which this extractor converts from.
+REGIONS = (
+    extractors.Region(
+        "icon_palettes",
+        ROM_FILES[0],
+        ICON_PALETTE_TABLE_OFFSET,
+        ICON_PALETTE_RECORD.size * ICON_PALETTE_TABLE_COUNT,
+    ),
+)
+
 OTHERPOKE_FILES: dict[pokemon.Species, dict[str, AltFormSpriteSet]] = {
     pokemon.Species.deoxys: {
         "base": AltFormSpriteSet(154, 155, 0, 1),
@@ -149,270 +199,312 @@ OTHERPOKE_FILES: dict[pokemon.Species, dict[str, AltFormSpriteSet]] = {
 }
 
 
-def unpack_all(
-    narc: narc.NARC,
-    rom_filesys_root: pathlib.Path,
-    force: bool,
-) -> dict[NARCPath, pathlib.Path]:
-    all_narcs = [
-        NARCPath.pokegra,
-        NARCPath.otherpoke,
-        NARCPath.height,
-        NARCPath.poke_data,
-        NARCPath.poke_icon,
+def ncgr_jobs(ncgr: gfx.Source, nclr: gfx.Source, png: pathlib.Path) -> list[gfx.Job]:
+    if gfx.size(ncgr) == 0:
+        return []
+
+    return [gfx.NCGRToPNG(ncgr, nclr, png, extra_args=("-scanfronttoback", "-handleempty"))]
+
+
+def sprite_jobs(members: narc.Members, dest_root: pathlib.Path, i: int) -> list[gfx.Job]:
+    j = i * 6
+    f_back = members[j]
+    m_back = members[j + 1]
+    f_front = members[j + 2]
+    m_front = members[j + 3]
+    normal_pal = members[j + 4]
+    shiny_pal = members[j + 5]
+
+    jobs = [
+        *ncgr_jobs(f_back, normal_pal, dest_root / "female_back.png"),
+        *ncgr_jobs(m_back, normal_pal, dest_root / "male_back.png"),
+        *ncgr_jobs(f_front, normal_pal, dest_root / "female_front.png"),
+        *ncgr_jobs(m_front, normal_pal, dest_root / "male_front.png"),
     ]
-    return unpack_narcs(narc, all_narcs, rom_filesys_root, force)
 
+    if i != 0:
+        jobs.append(gfx.NCLRToPAL(normal_pal, dest_root / "normal.pal", bitdepth=8))
+        jobs.append(gfx.NCLRToPAL(shiny_pal, dest_root / "shiny.pal", bitdepth=8))
 
-def convert_ncgr(gfx: gfx.GFX, ncgr: pathlib.Path, nclr: pathlib.Path, png: pathlib.Path):
-    if os.stat(ncgr).st_size == 0:
-        return
+    return jobs
 
-    gfx.ncgr_to_png(
-        ncgr,
-        png,
-        nclr,
-        extra_args=[
-            "-scanfronttoback",
-            "-handleempty",
-        ],
-    )
 
+def raw_palettes(
+    members: dict[NARCPath, narc.Members],
+    project_root: pathlib.Path,
+) -> list[tuple[gfx.Source, pathlib.Path]]:
+    """
+    Lists the palettes of the placeholder species, which are copied into the project as NCLRs
+    rather than converted.
+    """
+    pokegra = members[NARCPath.pokegra]
+    dest_root = project_root / "res" / "pokemon" / MON_DIRS[0]
+    return [
+        (pokegra[4], dest_root / "normal_pal.NCLR"),
+        (pokegra[5], dest_root / "shiny_pal.NCLR"),
+    ]
 
-def convert_sprite(contents: pathlib.Path, gfx: gfx.GFX, dest_root: pathlib.Path, i: int):
-    j = i * 6
-    f_back = contents / f"{NARCPath.pokegra.value.stem}_{j:08}.NCGR"
-    m_back = contents / f"{NARCPath.pokegra.value.stem}_{j+1:08}.NCGR"
-    f_front = contents / f"{NARCPath.pokegra.value.stem}_{j+2:08}.NCGR"
-    m_front = contents / f"{NARCPath.pokegra.value.stem}_{j+3:08}.NCGR"
-    normal_pal = contents / f"{NARCPath.pokegra.value.stem}_{j+4:08}.NCLR"
-    shiny_pal = contents / f"{NARCPath.pokegra.value.stem}_{j+5:08}.NCLR"
-
-    shutil.copy(f_back.with_suffix(".bin"), f_back)
-    shutil.copy(m_back.with_suffix(".bin"), m_back)
-    shutil.copy(f_front.with_suffix(".bin"), f_front)
-    shutil.copy(m_front.with_suffix(".bin"), m_front)
-    shutil.copy(normal_pal.with_suffix(".bin"), normal_pal)
-    shutil.copy(shiny_pal.with_suffix(".bin"), shiny_pal)
-
-    convert_ncgr(gfx, f_back, normal_pal, dest_root / "female_back.png")
-    convert_ncgr(gfx, m_back, normal_pal, dest_root / "male_back.png")
-    convert_ncgr(gfx, f_front, normal_pal, dest_root / "female_front.png")
-    convert_ncgr(gfx, m_front, normal_pal, dest_root / "male_front.png")
-
-    if i == 0:
-        shutil.copy(normal_pal, dest_root / "normal_pal.NCLR")
-        shutil.copy(shiny_pal, dest_root / "shiny_pal.NCLR")
-    else:
-        gfx.nclr_to_pal(normal_pal, dest_root / "normal.pal", bitdepth=8)
-        gfx.nclr_to_pal(shiny_pal, dest_root / "shiny.pal", bitdepth=8)
-
-
-def parse_frames(b: bytes) -> list[dict[str, int]]:
+
+def copy_raw_palettes(members: dict[NARCPath, narc.Members], project_root: pathlib.Path):
+    for source, dest in raw_palettes(members, project_root):
+        gfx.save(source, dest)
+
+
+def parse_frames(values: tuple[int, ...]) -> list[dict[str, int]]:
     return [
         {
-            "sprite_frame": sint8(b[i]),
-            "frame_delay": sint8(b[i + 1]),
-            "x_shift": sint8(b[i + 2]),
-            "y_shift": sint8(b[i + 3]),
+            "sprite_frame": values[i],
+            "frame_delay": values[i + 1],
+            "x_shift": values[i + 2],
+            "y_shift": values[i + 3],
         }
         for i in range(0, 40, 4)
     ]
 
 
-def convert_sprite_data(
-    height_contents: pathlib.Path,
-    poke_data_bin: bytes,
-    dest_root: pathlib.Path,
-    i: int,
-):
-    j = i * 4
-    h_f_back = open(height_contents / f"{NARCPath.height.value.stem}_{j:08}.bin", "rb").read()
-    h_m_back = open(height_contents / f"{NARCPath.height.value.stem}_{j+1:08}.bin", "rb").read()
-    h_f_front = open(height_contents / f"{NARCPath.height.value.stem}_{j+2:08}.bin", "rb").read()
-    h_m_front = open(height_contents / f"{NARCPath.height.value.stem}_{j+3:08}.bin", "rb").read()
-
-    with open(dest_root / "sprite_data.json", "r") as f:
-        sprite_data_json = json.load(f)
-
-    sprite_data_json["back"]["y_offset"]["female"] = le_int(h_f_back)
-    sprite_data_json["back"]["y_offset"]["male"] = le_int(h_m_back)
-    sprite_data_json["front"]["y_offset"]["female"] = le_int(h_f_front)
-    sprite_data_json["front"]["y_offset"]["male"] = le_int(h_m_front)
-
-    j = i * 89
-    sprite_data_json["front"]["cry_delay"] = sint8(poke_data_bin[j])
-    sprite_data_json["front"]["animation"] = poke_data_bin[j + 1]
-    sprite_data_json["front"]["start_delay"] = poke_data_bin[j + 2]
-    sprite_data_json["front"]["frames"] = parse_frames(poke_data_bin[j + 3 : j + 43])
-    sprite_data_json["back"]["cry_delay"] = sint8(poke_data_bin[j + 43])
-    sprite_data_json["back"]["animation"] = poke_data_bin[j + 44]
-    sprite_data_json["back"]["start_delay"] = poke_data_bin[j + 45]
-    sprite_data_json["back"]["frames"] = parse_frames(poke_data_bin[j + 46 : j + 86])
-    sprite_data_json["front"]["addl_y_offset"] = sint8(poke_data_bin[j + 86])
-    sprite_data_json["shadow"]["x_offset"] = sint8(poke_data_bin[j + 87])
-    sprite_data_json["shadow"]["size"] = pokemon.ShadowSize(int(poke_data_bin[j + 88])).name
-
-    with open(dest_root / "sprite_data.json", "w", encoding="utf-8") as f:
-        json.dump(sprite_data_json, f, indent=4, ensure_ascii=False)
-
-
-def convert_icon(
-    contents: pathlib.Path,
-    gfx: gfx.GFX,
+def decode_sprite_data(
+    height: narc.NARCArchive,
+    poke_data: memoryview,
+    count: int,
+) -> list[dict]:
+    """
+    Decodes the sprite data for the first `count` base forms, column by column, from the height
+    and pl_poke_data tables.
+
+    Returns, for each species, the values to merge into its sprite_data.json.
+    """
+    # Each height member holds a single byte, so the members line up as a table of records only
+    # if every one of them is exactly that size.
+    members = list(height)[: count * HEIGHT_RECORD.size]
+    if any(len(member) != 1 for member in members):
+        raise ValueError("height members are not all exactly 1 byte; cannot decode as a table")
+
+    heights = records.Table(HEIGHT_RECORD, b"".join(members), count).columns()
+    sprites = records.Table(POKE_DATA_RECORD, poke_data, count).columns()
+
+    return [
+        {
+            "front": {
+                "y_offset": {
+                    "female": heights["female_front"][i],
+                    "male": heights["male_front"][i],
+                },
+                "cry_delay": sprites["front_cry_delay"][i],
+                "animation": sprites["front_animation"][i],
+                "start_delay": sprites["front_start_delay"][i],
+                "frames": parse_frames(sprites["front_frames"][i]),
+                "addl_y_offset": sprites["front_addl_y_offset"][i],
+            },
+            "back": {
+                "y_offset": {
+                    "female": heights["female_back"][i],
+                    "male": heights["male_back"][i],
+                },
+                "cry_delay": sprites["back_cry_delay"][i],
+                "animation": sprites["back_animation"][i],
+                "start_delay": sprites["back_start_delay"][i],
+                "frames": parse_frames(sprites["back_frames"][i]),
+            },
+            "shadow": {
+                "x_offset": sprites["shadow_x_offset"][i],
+                "size": pokemon.ShadowSize(sprites["shadow_size"][i]).name,
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def merge(into: dict, values: dict):
+    for key, value in values.items():
+        if isinstance(value, dict) and isinstance(into.get(key), dict):
+            merge(into[key], value)
+        else:
+            into[key] = value
+
+
+def icon_jobs(
+    members: narc.Members,
     dest_root: pathlib.Path,
     i: int,
-    pal_nclr: pathlib.Path,
+    pal_nclr: gfx.Source,
     pal_table: list[int],
-):
+) -> list[gfx.Job]:
     file_idx = i + 7
     pal_idx = pal_table[i] + 1
 
-    ncgr = contents / f"{narc_path.NARCPath.poke_icon.value.stem}_{file_idx:08}.NCGR"
-    shutil.copy(ncgr.with_suffix(".bin"), ncgr)
+    ncgr = members[file_idx]
 
-    gfx.ncgr_to_png(ncgr, dest_root / "icon.png", pal_nclr, pal_idx, ["-width", "4"])
+    return [gfx.NCGRToPNG(ncgr, pal_nclr, dest_root / "icon.png", pal_idx, ("-width", "4"))]
 
 
-def convert_base_forms(
-    contents: dict[NARCPath, pathlib.Path],
-    gfx: gfx.GFX,
+def render_sprite_data(current: str, values: dict) -> str:
+    """
+    Merges decoded sprite data into the current contents of a sprite_data.json.
+    """
+    sprite_data_json = json.loads(current)
+    merge(sprite_data_json, values)
+    return json.dumps(sprite_data_json, indent=4, ensure_ascii=False)
+
+
+def all_sprite_data(archives: dict[NARCPath, narc.NARCArchive]) -> list[dict]:
+    return decode_sprite_data(
+        archives[NARCPath.height],
+        archives[NARCPath.poke_data][0],
+        pokemon.MAX_SPECIES,
+    )
+
+
+def convert_all_sprite_data(archives: dict[NARCPath, narc.NARCArchive], project_root: pathlib.Path):
+    """
+    Converts additional sprite data (i.e., height offsets, animation frames, and shadow size) for
+    every base form.
+
+    Only the sprite_data.json files whose contents change are rewritten.
+    """
+    res_pokemon_root = project_root / "res" / "pokemon"
+    sprite_data = all_sprite_data(archives)
+
+    rich.print("Converting sprite data...")
+    with info.progress() as p:
+        for species, values in p.track(zip(pokemon.Species, sprite_data), total=len(sprite_data)):
+            with tracing.span(species, "species"):
+                sprite_data_file = res_pokemon_root / species / "sprite_data.json"
+                current = sprite_data_file.read_text(encoding="utf-8")
+                updated = render_sprite_data(current, values)
+                if updated != current:
+                    outputs.write_text(sprite_data_file, updated)
+
+
+def base_form_jobs(
+    members: dict[NARCPath, narc.Members],
     project_root: pathlib.Path,
-    icon_pal_file: pathlib.Path,
+    icon_pal_file: gfx.Source,
     icon_pal_table: list[int],
-):
+) -> typing.Iterator[gfx.Job]:
     """
-    Converts entries for base form sprites and additional sprite data (i.e., height offsets,
-    animation frames, and shadow size).
+    Produces conversions for base form sprites and icons, plus the shared icon palette, cells, and
+    animations, species by species.
     """
     res_pokemon_root = project_root / "res" / "pokemon"
     shared_root = res_pokemon_root / ".shared"
-    pokegra_contents = contents[NARCPath.pokegra]
-    poke_icon_contents = contents[NARCPath.poke_icon]
-    height_contents = contents[NARCPath.height]
-    poke_data_bin_f = contents[NARCPath.poke_data] / f"{NARCPath.poke_data.value.stem}_00000000.bin"
-    poke_data_bin = open(poke_data_bin_f, "rb").read()
+    pokegra = members[NARCPath.pokegra]
+    poke_icon = members[NARCPath.poke_icon]
 
     icon_stem = NARCPath.poke_icon.value.stem
 
+    yield gfx.NCLRToPAL(icon_pal_file, shared_root / f"{icon_stem}.pal")
     for i in range(3):
-        icon_nanr = poke_icon_contents / f"{icon_stem}_{(i*2)+1:08}.NANR"
-        icon_ncer = poke_icon_contents / f"{icon_stem}_{(i*2)+2:08}.NCER"
-        shutil.copy(icon_nanr.with_suffix(".bin"), icon_nanr)
-        shutil.copy(icon_ncer.with_suffix(".bin"), icon_ncer)
-        gfx.ncer_to_json(icon_ncer, shared_root / f"{icon_stem}_cell_{i+1:02}.json")
-        gfx.nanr_to_json(icon_nanr, shared_root / f"{icon_stem}_anim_{i+1:02}.json")
-
-    rich.print("Converting base form sprites...")
-    with info.progress() as p:
-        for i, species in p.track(enumerate(pokemon.Species), total=pokemon.MAX_SPECIES):
+        icon_nanr = poke_icon[(i * 2) + 1]
+        icon_ncer = poke_icon[(i * 2) + 2]
+        yield gfx.NCERToJSON(icon_ncer, shared_root / f"{icon_stem}_cell_{i+1:02}.json")
+        yield gfx.NANRToJSON(icon_nanr, shared_root / f"{icon_stem}_anim_{i+1:02}.json")
+
+    for i, species in enumerate(pokemon.Species):
+        with tracing.span(species, "species"):
             mon_root = res_pokemon_root / species
-            convert_sprite(pokegra_contents, gfx, mon_root, i)
-            convert_sprite_data(height_contents, poke_data_bin, mon_root, i)
-            convert_icon(poke_icon_contents, gfx, mon_root, i, icon_pal_file, icon_pal_table)
+            jobs = [
+                *sprite_jobs(pokegra, mon_root, i),
+                *icon_jobs(poke_icon, mon_root, i, icon_pal_file, icon_pal_table),
+            ]
 
+        yield from jobs
 
-def convert_alt_forms(
-    contents: dict[NARCPath, pathlib.Path],
-    gfx: gfx.GFX,
+
+def alt_form_jobs(
+    members: dict[NARCPath, narc.Members],
     project_root: pathlib.Path,
-    icon_pal_file: pathlib.Path,
+    icon_pal_file: gfx.Source,
     icon_pal_table: list[int],
-):
+) -> typing.Iterator[gfx.Job]:
+    """
+    Produces conversions for alt form sprites and icons, eggs, and the shared substitute and shadow
+    sprites, form by form.
+    """
     res_pokemon_root = project_root / "res" / "pokemon"
-    otherpoke_contents = contents[NARCPath.otherpoke]
-    poke_icon_contents = contents[NARCPath.poke_icon]
+    otherpoke = members[NARCPath.otherpoke]
+    poke_icon = members[NARCPath.poke_icon]
     egg_root = res_pokemon_root / "egg"
     shared_root = res_pokemon_root / ".shared"
 
-    rich.print("Converting alt form sprites...")
-
-    otherpoke_stem = NARCPath.otherpoke.value.stem
-
-    egg_base = otherpoke_contents / f"{otherpoke_stem}_00000132.NCGR"
-    egg_manaphy = otherpoke_contents / f"{otherpoke_stem}_00000133.NCGR"
-    egg_base_pal = otherpoke_contents / f"{otherpoke_stem}_00000226.NCLR"
-    egg_manaphy_pal = otherpoke_contents / f"{otherpoke_stem}_00000227.NCLR"
-    shutil.copy(egg_base.with_suffix(".bin"), egg_base)
-    shutil.copy(egg_manaphy.with_suffix(".bin"), egg_manaphy)
-    shutil.copy(egg_base_pal.with_suffix(".bin"), egg_base_pal)
-    shutil.copy(egg_manaphy_pal.with_suffix(".bin"), egg_manaphy_pal)
-
-    convert_ncgr(gfx, egg_base, egg_base_pal, egg_root / "front.png")
-    convert_ncgr(gfx, egg_manaphy, egg_manaphy_pal, egg_root / "forms" / "manaphy" / "front.png")
-    gfx.nclr_to_pal(egg_base_pal, egg_root / "normal.pal", bitdepth=8)
-    gfx.nclr_to_pal(egg_manaphy_pal, egg_root / "forms" / "manaphy" / "normal.pal", bitdepth=8)
-    convert_icon(
-        poke_icon_contents,
-        gfx,
-        egg_root,
-        pokemon.MAX_SPECIES + 0,
-        icon_pal_file,
-        icon_pal_table,
-    )
-    convert_icon(
-        poke_icon_contents,
-        gfx,
-        egg_root / "forms" / "manaphy",
-        pokemon.MAX_SPECIES + 1,
-        icon_pal_file,
-        icon_pal_table,
-    )
+    egg_base = otherpoke[132]
+    egg_manaphy = otherpoke[133]
+    egg_base_pal = otherpoke[226]
+    egg_manaphy_pal = otherpoke[227]
+
+    jobs = [
+        *ncgr_jobs(egg_base, egg_base_pal, egg_root / "front.png"),
+        *ncgr_jobs(egg_manaphy, egg_manaphy_pal, egg_root / "forms" / "manaphy" / "front.png"),
+        gfx.NCLRToPAL(egg_base_pal, egg_root / "normal.pal", bitdepth=8),
+        gfx.NCLRToPAL(egg_manaphy_pal, egg_root / "forms" / "manaphy" / "normal.pal", bitdepth=8),
+        *icon_jobs(
+            poke_icon,
+            egg_root,
+            pokemon.MAX_SPECIES + 0,
+            icon_pal_file,
+            icon_pal_table,
+        ),
+        *icon_jobs(
+            poke_icon,
+            egg_root / "forms" / "manaphy",
+            pokemon.MAX_SPECIES + 1,
+            icon_pal_file,
+            icon_pal_table,
+        ),
+    ]
 
-    sub_back = otherpoke_contents / f"{otherpoke_stem}_00000248.NCGR"
-    sub_front = otherpoke_contents / f"{otherpoke_stem}_00000249.NCGR"
-    sub_pal = otherpoke_contents / f"{otherpoke_stem}_00000250.NCLR"
-    shutil.copy(sub_back.with_suffix(".bin"), sub_back)
-    shutil.copy(sub_front.with_suffix(".bin"), sub_front)
-    shutil.copy(sub_pal.with_suffix(".bin"), sub_pal)
+    sub_back = otherpoke[248]
+    sub_front = otherpoke[249]
+    sub_pal = otherpoke[250]
 
-    convert_ncgr(gfx, sub_back, sub_pal, shared_root / "substitute_back.png")
-    convert_ncgr(gfx, sub_front, sub_pal, shared_root / "substitute_front.png")
-    gfx.nclr_to_pal(sub_pal, shared_root / "substitute.pal", bitdepth=8)
+    jobs.extend(ncgr_jobs(sub_back, sub_pal, shared_root / "substitute_back.png"))
+    jobs.extend(ncgr_jobs(sub_front, sub_pal, shared_root / "substitute_front.png"))
+    jobs.append(gfx.NCLRToPAL(sub_pal, shared_root / "substitute.pal", bitdepth=8))
 
-    shadows_img = otherpoke_contents / f"{otherpoke_stem}_00000251.NCGR"
-    shadows_pal = otherpoke_contents / f"{otherpoke_stem}_00000252.NCLR"
-    shutil.copy(shadows_img.with_suffix(".bin"), shadows_img)
-    shutil.copy(shadows_pal.with_suffix(".bin"), shadows_pal)
+    shadows_img = otherpoke[251]
+    shadows_pal = otherpoke[252]
 
-    convert_ncgr(gfx, shadows_img, shadows_pal, shared_root / "shadows.png")
-    gfx.nclr_to_pal(shadows_pal, shared_root / "shadows.pal", bitdepth=8)
+    jobs.extend(ncgr_jobs(shadows_img, shadows_pal, shared_root / "shadows.png"))
+    jobs.append(gfx.NCLRToPAL(shadows_pal, shared_root / "shadows.pal", bitdepth=8))
+    yield from jobs
 
-    with info.progress() as p:
-        for species, forms in p.track(OTHERPOKE_FILES.items()):
-            mon_root = res_pokemon_root / species / "forms"
-            mon_shared_pal = None
+    for species, forms in OTHERPOKE_FILES.items():
+        mon_root = res_pokemon_root / species / "forms"
+        mon_shared_pal = None
 
-            for form, sprites in forms.items():
+        for form, sprites in forms.items():
+            with tracing.span(f"{species}/{form}", "form"):
+                jobs = []
                 form_dir = mon_root / form
 
-                back = otherpoke_contents / f"{otherpoke_stem}_{sprites.back:08}.NCGR"
-                front = otherpoke_contents / f"{otherpoke_stem}_{sprites.front:08}.NCGR"
-                normal = otherpoke_contents / f"{otherpoke_stem}_{sprites.normal_pal:08}.NCLR"
-                shiny = otherpoke_contents / f"{otherpoke_stem}_{sprites.shiny_pal:08}.NCLR"
-
-                shutil.copy(back.with_suffix(".bin"), back)
-                shutil.copy(front.with_suffix(".bin"), front)
-                shutil.copy(normal.with_suffix(".bin"), normal)
-                shutil.copy(shiny.with_suffix(".bin"), shiny)
+                back = otherpoke[sprites.back]
+                front = otherpoke[sprites.front]
+                normal = otherpoke[sprites.normal_pal]
+                shiny = otherpoke[sprites.shiny_pal]
 
-                convert_ncgr(gfx, back, normal, form_dir / "back.png")
-                convert_ncgr(gfx, front, normal, form_dir / "front.png")
+                jobs.extend(ncgr_jobs(back, normal, form_dir / "back.png"))
+                jobs.extend(ncgr_jobs(front, normal, form_dir / "front.png"))
 
                 if not mon_shared_pal:
                     mon_shared_pal = normal
                 elif mon_shared_pal != normal:
-                    gfx.nclr_to_pal(normal, form_dir / "normal.pal", bitdepth=8)
-                    gfx.nclr_to_pal(shiny, form_dir / "shiny.pal", bitdepth=8)
+                    jobs.append(gfx.NCLRToPAL(normal, form_dir / "normal.pal", bitdepth=8))
+                    jobs.append(gfx.NCLRToPAL(shiny, form_dir / "shiny.pal", bitdepth=8))
 
                 if sprites.icon:
                     idx = pokemon.MAX_SPECIES + sprites.icon
-                    convert_icon(
-                        poke_icon_contents, gfx, form_dir, idx, icon_pal_file, icon_pal_table
-                    )
+                    jobs.extend(icon_jobs(poke_icon, form_dir, idx, icon_pal_file, icon_pal_table))
 
+            yield from jobs
 
-def convert_icon_palettes(project_root: pathlib.Path, icon_pal_table: list[int]):
+
+def icon_palettes_header(project_root: pathlib.Path) -> pathlib.Path:
+    return project_root / "include" / "data" / "pokeicon_palettes.h"
+
+
+def render_icon_palettes(current: str, icon_pal_table: list[int]) -> str:
+    """
+    Replaces the icon palette table at the end of the header's current contents.
+    """
     lines = ["    [SPECIES_NONE]".ljust(29) + f" = {icon_pal_table[0]},\n"]
     for i, species in enumerate(pokemon.Species):
         if i == 0:
@@ -436,37 +528,181 @@ def convert_icon_palettes(project_root: pathlib.Path, icon_pal_table: list[int])
 
     lines.extend(['};\n', '// clang-format off']) # add these manually
 
-    with open(project_root / 'include' / 'data' / 'pokeicon_palettes.h', 'r+') as pal_file:
-        all_lines = pal_file.readlines()
-        pal_file.seek(0)
+    all_lines = current.splitlines(keepends=True)
+
+    for i, line in enumerate(all_lines):
+        if "sPokemonIconPaletteIndex[] = {" in line:
+            all_lines = all_lines[:i+1]
+            break
+    all_lines.extend(lines)
+    return "".join(all_lines)
+
+
+def convert_icon_palettes(project_root: pathlib.Path, icon_pal_table: list[int]):
+    pal_file = icon_palettes_header(project_root)
+    current = pal_file.read_text(encoding="utf-8")
+    outputs.write_text(pal_file, render_icon_palettes(current, icon_pal_table))
+
 
-        for i, line in enumerate(all_lines):
-            if "sPokemonIconPaletteIndex[] = {" in line:
-                all_lines = all_lines[:i+1]
-                break
-        all_lines.extend(lines)
-        pal_file.writelines(all_lines)
+def read_icon_palette_table(arm9: gfx.Source) -> list[int]:
+    """
+    Reads the palette index of every icon from the ARM9 binary.
+    """
+    table = REGIONS[0]
+    data = gfx.read_range(arm9, table.offset, table.size)
+    return records.Table(ICON_PALETTE_RECORD, data).column("palette")
+
+
+def changed_jobs(
+    jobs: typing.Iterable[gfx.Job],
+    changes: manifest.Changes,
+    all_members: dict[NARCPath, narc.Members],
+    icon_pal: gfx.Source,
+) -> typing.Iterator[gfx.Job]:
+    """
+    Keeps only the jobs which read a changed member.
+
+    The icon palette table picks which palette of the icon palette file each icon uses, so a change
+    to it counts as a change to that file.
+    """
+    changed = {
+        all_members[np][i]
+        for np, indices in changes.members.items()
+        if np in all_members
+        for i in indices
+    }
+    if REGIONS[0].name in changes.regions:
+        changed.add(icon_pal)
+
+    return (
+        job for job in jobs if job.source in changed or getattr(job, "palette", None) in changed
+    )
+
+
+def status(
+    all_members: dict[NARCPath, narc.Members],
+    all_archives: dict[NARCPath, narc.NARCArchive],
+    rom_files: dict[pathlib.PurePath, gfx.Source],
+    project_root: pathlib.Path,
+) -> list[tuple[pathlib.Path, diff.State]]:
+    """
+    Compares every file `extract` would write against the project, without writing anything.
+
+    Arguments:
+    all_members -- members of each NARC in UNPACKS, on disk or in memory
+    all_archives -- opened archives of each NARC in OPENS
+    rom_files -- each file in ROM_FILES, on disk or in memory
+    project_root -- root of the target project
+    """
+    icon_pal_tbl = read_icon_palette_table(rom_files[ROM_FILES[0]])
+    icon_pal = all_members[NARCPath.poke_icon][0]
+    renderer = gfx.NativeGFX()
+    results = []
+
+    for job in [
+        *base_form_jobs(all_members, project_root, icon_pal, icon_pal_tbl),
+        *alt_form_jobs(all_members, project_root, icon_pal, icon_pal_tbl),
+    ]:
+        if isinstance(job, gfx.NCGRToPNG):
+            results.append((job.output, diff.compare_image(job.output, renderer.image(job))))
+        else:
+            results.append((job.output, diff.compare_bytes(job.output, renderer.render(job))))
+
+    for source, dest in raw_palettes(all_members, project_root):
+        results.append((dest, diff.compare_bytes(dest, gfx.read(source))))
+
+    res_pokemon_root = project_root / "res" / "pokemon"
+    for species, values in zip(pokemon.Species, all_sprite_data(all_archives)):
+        sprite_data_file = res_pokemon_root / species / "sprite_data.json"
+        state = diff.State.ADDED
+        if sprite_data_file.exists():
+            updated = render_sprite_data(sprite_data_file.read_text(encoding="utf-8"), values)
+            state = diff.compare_bytes(sprite_data_file, updated.encode("utf-8"))
+        results.append((sprite_data_file, state))
+
+    pal_file = icon_palettes_header(project_root)
+    state = diff.State.ADDED
+    if pal_file.exists():
+        updated = render_icon_palettes(pal_file.read_text(encoding="utf-8"), icon_pal_tbl)
+        state = diff.compare_bytes(pal_file, updated.encode("utf-8"))
+    results.append((pal_file, state))
+
+    return results
 
 
 def extract(
-    narc: narc.NARC,
     gfx: gfx.GFX,
-    rom_filesys_root: pathlib.Path,
+    all_members: dict[NARCPath, narc.Members],
+    all_archives: dict[NARCPath, narc.NARCArchive],
+    rom_files: dict[pathlib.PurePath, gfx.Source],
     project_root: pathlib.Path,
     force: bool,
+    jobs: int = 1,
+    conversions_file: pathlib.Path | None = None,
+    changes: manifest.Changes | None = None,
 ):
-    all_contents = unpack_all(narc, rom_filesys_root, force)
-
-    icon_pal_tbl = []
-    with open(rom_filesys_root.parent / "arm9.bin", "rb") as arm9:
-        arm9.seek(0xF0780, 0)
-        icon_pal_tbl = [int(b) for b in arm9.read(0x21C)]
-
-    icon_stem = NARCPath.poke_icon.value.stem
-    icon_pal = all_contents[NARCPath.poke_icon] / f"{icon_stem}_00000000.NCLR"
-    shutil.copy(icon_pal.with_suffix(".bin"), icon_pal)
-    gfx.nclr_to_pal(icon_pal, project_root / "res" / "pokemon" / ".shared" / f"{icon_stem}.pal")
-
-    convert_base_forms(all_contents, gfx, project_root, icon_pal, icon_pal_tbl)
-    convert_alt_forms(all_contents, gfx, project_root, icon_pal, icon_pal_tbl)
-    convert_icon_palettes(project_root, icon_pal_tbl)
+    """
+    Extracts all Pokémon sprites, icons, palettes and sprite data into the project.
+
+    Arguments:
+    gfx -- GFX implementation to convert with
+    all_members -- members of each NARC in UNPACKS, on disk or in memory
+    all_archives -- opened archives of each NARC in OPENS
+    rom_files -- each file in ROM_FILES, on disk or in memory
+    project_root -- root of the target project
+    force -- if True, redo every conversion
+    jobs -- number of conversions which may run at once
+    conversions_file -- where to record finished conversions, so that later runs may skip them; if
+        None, every conversion is run
+    changes -- inputs which differ from the unmodified game; if given, only conversions reading
+        one of them are run
+    """
+    icon_pal_tbl = read_icon_palette_table(rom_files[ROM_FILES[0]])
+    icon_pal = all_members[NARCPath.poke_icon][0]
+
+    copy_raw_palettes(all_members, project_root)
+
+    collected = 0
+
+    def collect():
+        # Jobs are produced as their members become ready, and converted as they are produced.
+        nonlocal collected
+        for job in itertools.chain(
+            base_form_jobs(all_members, project_root, icon_pal, icon_pal_tbl),
+            alt_form_jobs(all_members, project_root, icon_pal, icon_pal_tbl),
+        ):
+            collected += 1
+            yield job
+
+    all_jobs = collect()
+    if changes is not None:
+        all_jobs = changed_jobs(all_jobs, changes, all_members, icon_pal)
+
+    conversions = None
+    if conversions_file:
+        conversions = cache.ConversionCache(conversions_file)
+        if force:
+            conversions.clear()
+
+    def convert_data():
+        with tracing.span("convert sprite data", "stage"):
+            convert_all_sprite_data(all_archives, project_root)
+        with tracing.span("convert icon palettes", "stage"):
+            convert_icon_palettes(project_root, icon_pal_tbl)
+
+    # Sprite data and icon palettes go to files which no sprite conversion writes, so they are
+    # converted alongside the sprites rather than after them.
+    with concurrent.futures.ThreadPoolExecutor(1) as pool:
+        data = pool.submit(convert_data)
+
+        rich.print("Converting sprites...")
+        with tracing.span("convert sprites", "stage") as span:
+            span["jobs"] = convert_batch(gfx, all_jobs, jobs, conversions)
+
+        data.result()
+
+    if changes is not None:
+        rich.print(
+            f"[bold cyan]🛈[/] {collected - span['jobs']} of {collected} conversions read only "
+            "unmodified data; skipped"
+        )
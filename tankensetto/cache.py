@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import pathlib
+
+from tankensetto.tools import gfx
+
+
+def digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+@dataclasses.dataclass
+class Entry:
+    """
+    Record of a completed conversion: the key of its inputs and the state of the output it wrote.
+    """
+
+    key: str
+    digest: str
+    size: int
+    mtime_ns: int
+
+
+class ConversionCache:
+    """
+    Persistent record of completed conversions, keyed by the content of each conversion's inputs.
+
+    A conversion is fresh when its inputs, options and backend version hash to the same key as
+    the last time it ran, and its output file is still the one that run wrote.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: pathlib.Path) -> None:
+        """
+        Constructor; loads any existing cache at the given path.
+
+        Arguments:
+        path -- path to the cache file
+        """
+        self.path = path
+        self.entries: dict[str, Entry] = {}
+        self._digests: dict[pathlib.Path, str] = {}
+
+        try:
+            stored = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+
+        if stored.get("version") == self.VERSION:
+            self.entries = {out: Entry(**entry) for out, entry in stored["entries"].items()}
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def key(self, backend: gfx.GFX, job: gfx.Job) -> str:
+        """
+        Compute the cache key for a conversion job.
+
+        Arguments:
+        backend -- the GFX implementation which will run the job
+        job -- the conversion job
+        """
+        h = hashlib.sha1()
+        h.update(f"{backend.version}\0{type(job).__name__}\0".encode())
+        for field in dataclasses.fields(job):
+            value = getattr(job, field.name)
+            if field.name == "output":
+                continue
+            if isinstance(value, bytes):
+                h.update(digest(value).encode())
+            elif isinstance(value, pathlib.Path):
+                h.update(self._digest_of(value).encode())
+            else:
+                h.update(repr(value).encode())
+            h.update(b"\0")
+
+        return h.hexdigest()
+
+    def is_fresh(self, job: gfx.Job, key: str) -> bool:
+        """
+        Check whether a job's output is still the product of the inputs described by `key`.
+        """
+        entry = self.entries.get(str(job.output))
+        if entry is None or entry.key != key:
+            return False
+
+        try:
+            stat = job.output.stat()
+        except OSError:
+            return False
+
+        if stat.st_size != entry.size:
+            return False
+
+        # An untouched file needs no rehash; a touched one may still hold the same bytes.
+        if stat.st_mtime_ns == entry.mtime_ns:
+            return True
+
+        if digest(job.output.read_bytes()) != entry.digest:
+            return False
+
+        entry.mtime_ns = stat.st_mtime_ns
+        return True
+
+    def record(self, job: gfx.Job, key: str) -> None:
+        """
+        Record that a job has just written its output from the inputs described by `key`.
+        """
+        stat = job.output.stat()
+        self.entries[str(job.output)] = Entry(
+            key,
+            digest(job.output.read_bytes()),
+            stat.st_size,
+            stat.st_mtime_ns,
+        )
+
+    def save(self) -> None:
+        """
+        Write the cache to disk, replacing any previous version in a single step.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_name(f"{self.path.name}.tmp")
+        temp.write_text(
+            json.dumps(
+                {
+                    "version": self.VERSION,
+                    "entries": {out: dataclasses.asdict(e) for out, e in self.entries.items()},
+                }
+            ),
+            encoding="utf-8",
+        )
+        os.replace(temp, self.path)
+
+    def _digest_of(self, path: pathlib.Path) -> str:
+        # Palettes are shared by many jobs; hash each input once per run.
+        if path not in self._digests:
+            self._digests[path] = digest(path.read_bytes())
+
+        return self._digests[path]
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import enum
+import json
+import pathlib
+import struct
+import zlib
+
+import rich
+
+from tankensetto.formats import png
+from tankensetto.formats.nclr import Color
+
+
+class State(enum.StrEnum):
+    ADDED = enum.auto()
+    CHANGED = enum.auto()
+    IDENTICAL = enum.auto()
+
+
+def _read(path: pathlib.Path) -> bytes | None:
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def compare_image(
+    path: pathlib.Path,
+    image: tuple[int, int, int, list[Color], bytes],
+) -> State:
+    """
+    Compare a PNG in the project against the image extraction would write there.
+
+    The PNG is decoded rather than compared byte for byte, so that images written by another
+    encoder (e.g. nitrogfx) compare as identical whenever their pixels and palette match.
+
+    Arguments:
+    path -- PNG to compare against
+    image -- width, height, bitdepth, palette, and packed pixel rows, as taken by
+        `png.encode_indexed`
+    """
+    if (current := _read(path)) is None:
+        return State.ADDED
+
+    try:
+        (width, height, bitdepth, palette, rows) = png.decode_indexed(current)
+    except (ValueError, struct.error, zlib.error):
+        return State.CHANGED
+
+    # Encoders may leave unused colors out of the palette, which then read as black.
+    colors = 1 << bitdepth
+    palette = (palette + [(0, 0, 0)] * colors)[:colors]
+    return State.IDENTICAL if (width, height, bitdepth, palette, rows) == image else State.CHANGED
+
+
+def compare_bytes(path: pathlib.Path, expected: bytes) -> State:
+    """
+    Compare a file in the project against the contents extraction would write there.
+
+    Files which differ only in formatting compare as identical: palettes by their colors, and JSON
+    by its values.
+
+    Arguments:
+    path -- file to compare against
+    expected -- contents extraction would write
+    """
+    if (current := _read(path)) is None:
+        return State.ADDED
+    if current == expected:
+        return State.IDENTICAL
+
+    try:
+        match path.suffix:
+            case ".pal":
+                same = current.split() == expected.split()
+            case ".json":
+                same = json.loads(current) == json.loads(expected)
+            case _:
+                same = False
+    except ValueError:
+        same = False
+
+    return State.IDENTICAL if same else State.CHANGED
+
+
+def report(results: list[tuple[pathlib.Path, State]], project_root: pathlib.Path) -> dict:
+    """
+    Print which files extraction would add or change, grouped by the directory holding them (i.e.,
+    by species and form), followed by a count of each state.
+
+    Returns the number of files in each state.
+    """
+    groups: dict[pathlib.Path, list[tuple[str, State]]] = {}
+    counts = dict.fromkeys(State, 0)
+    for path, state in results:
+        counts[state] += 1
+        if state != State.IDENTICAL:
+            group = path.parent.relative_to(project_root)
+            groups.setdefault(group, []).append((path.name, state))
+
+    for group, files in sorted(groups.items()):
+        rich.print(f"[bold]{group}[/]")
+        for name, state in sorted(files):
+            color = "green" if state == State.ADDED else "yellow"
+            rich.print(f"    [{color}]{state:>9}[/]  {name}")
+
+    rich.print(
+        f"[bold green]{counts[State.ADDED]}[/] added, [bold yellow]{counts[State.CHANGED]}[/] "
+        f"changed, {counts[State.IDENTICAL]} identical"
+    )
+    return counts
@@ -17,16 +17,141 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import collections.abc
+import dataclasses
 import enum
+import importlib
+import pathlib
 import typing
 
-from tankensetto.assets import mon_sprites
+from tankensetto.constants.narc_path import NARCPath
 
 
 class AssetExtractor(enum.StrEnum):
     mon_sprites = enum.auto()
 
 
-EXTRACTORS: dict[AssetExtractor, typing.Callable] = {
-    AssetExtractor.mon_sprites: mon_sprites.extract
-}
+@dataclasses.dataclass(frozen=True)
+class Region:
+    """
+    A named range of bytes within a file of the ROM's extraction directory, e.g. a table in arm9.
+    """
+
+    name: str
+    rom_file: pathlib.PurePath
+    offset: int
+    size: int
+
+
+@dataclasses.dataclass(frozen=True)
+class Extractor:
+    """
+    Declaration of an asset extractor: the ROM inputs it needs, the project files it reads, and the
+    project files it produces.
+
+    Its status function compares what extraction would write against the project, writing nothing.
+    ROM files are relative to the ROM's extraction directory; NARCs need not be listed among them.
+    Regions single out the parts of those files the extractor actually reads.
+    Project paths are relative to the project root; a directory covers everything beneath it.
+    """
+
+    extract: typing.Callable
+    status: typing.Callable | None = None
+    rom_files: tuple[pathlib.PurePath, ...] = ()
+    unpacks: tuple[NARCPath, ...] = ()
+    opens: tuple[NARCPath, ...] = ()
+    regions: tuple[Region, ...] = ()
+    reads: tuple[pathlib.PurePath, ...] = ()
+    produces: tuple[pathlib.PurePath, ...] = ()
+
+    def conflicts_with(self, other: "Extractor") -> bool:
+        """
+        Check whether this extractor and another touch the same project files, with at least one
+        of them writing; such extractors may not run at the same time.
+        """
+        return overlaps(self.produces, other.reads + other.produces) or overlaps(
+            other.produces, self.reads
+        )
+
+
+def overlaps(a: tuple[pathlib.PurePath, ...], b: tuple[pathlib.PurePath, ...]) -> bool:
+    return any(x.is_relative_to(y) or y.is_relative_to(x) for x in a for y in b)
+
+
+class Registry(collections.abc.Mapping[AssetExtractor, Extractor]):
+    """
+    Every asset extractor, each loaded only when it is first looked up.
+
+    An extractor is declared by the module of the same name under `tankensetto.assets`, through its
+    `extract` and `status` functions and its ROM_FILES, UNPACKS, OPENS, REGIONS, READS, and
+    PRODUCES constants.
+    Those modules carry large tables, so they are not imported until an extractor is needed.
+    """
+
+    def __init__(self) -> None:
+        self._loaded: dict[AssetExtractor, Extractor] = {}
+
+    def __getitem__(self, asset: AssetExtractor) -> Extractor:
+        asset = AssetExtractor(asset)
+        if asset not in self._loaded:
+            module = importlib.import_module(f"tankensetto.assets.{asset}")
+            self._loaded[asset] = Extractor(
+                module.extract,
+                status=getattr(module, "status", None),
+                rom_files=module.ROM_FILES,
+                unpacks=module.UNPACKS,
+                opens=module.OPENS,
+                regions=module.REGIONS,
+                reads=module.READS,
+                produces=module.PRODUCES,
+            )
+
+        return self._loaded[asset]
+
+    def __iter__(self) -> typing.Iterator[AssetExtractor]:
+        return iter(AssetExtractor)
+
+    def __len__(self) -> int:
+        return len(AssetExtractor)
+
+
+EXTRACTORS = Registry()
+
+
+def rom_files(assets: typing.Iterable[AssetExtractor]) -> list[pathlib.PurePath]:
+    """
+    Collect every file the given extractors need from the ROM, relative to its extraction
+    directory.
+    """
+    needed: dict[pathlib.PurePath, None] = {}
+    for asset in assets:
+        extractor = EXTRACTORS[asset]
+        needed.update(dict.fromkeys(extractor.rom_files))
+        for np in extractor.unpacks + extractor.opens:
+            needed[pathlib.PurePath("filesys") / np.value] = None
+
+    return list(needed)
+
+
+def unpacks(assets: typing.Iterable[AssetExtractor]) -> list[NARCPath]:
+    """
+    Collect every NARC the given extractors need unpacked.
+    """
+    return list(dict.fromkeys(np for asset in assets for np in EXTRACTORS[asset].unpacks))
+
+
+def dependencies(assets: typing.Iterable[AssetExtractor]) -> dict[AssetExtractor, set]:
+    """
+    Build the dependency graph between the given extractors.
+
+    Where two extractors conflict, the one declared first in `AssetExtractor` runs first.
+
+    Returns a mapping of each extractor to the set of extractors which must finish before it.
+    """
+    ordered = sorted(set(assets), key=list(AssetExtractor).index)
+    return {
+        asset: {
+            before for before in ordered[:i] if EXTRACTORS[before].conflicts_with(EXTRACTORS[asset])
+        }
+        for i, asset in enumerate(ordered)
+    }
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import struct
+
+from tankensetto.formats import nitro
+
+RESULT_INDEX = 0
+RESULT_SRT = 1
+RESULT_T = 2
+
+
+def _result(frame_data: memoryview, offset: int, result_type: int) -> dict:
+    if result_type == RESULT_SRT:
+        (index, rotation, scale_x, scale_y, pos_x, pos_y) = struct.unpack_from(
+            "<HHiihh", frame_data, offset
+        )
+        return {
+            "resultType": result_type,
+            "index": index,
+            "rotation": rotation,
+            "scaleX": scale_x,
+            "scaleY": scale_y,
+            "positionX": pos_x,
+            "positionY": pos_y,
+        }
+
+    if result_type == RESULT_T:
+        (index, _, pos_x, pos_y) = struct.unpack_from("<HHhh", frame_data, offset)
+        return {
+            "resultType": result_type,
+            "index": index,
+            "positionX": pos_x,
+            "positionY": pos_y,
+        }
+
+    (index,) = struct.unpack_from("<H", frame_data, offset)
+    return {"resultType": RESULT_INDEX, "index": index}
+
+
+def to_json(data: bytes | memoryview) -> str:
+    """
+    Convert an NANR to JSON, laid out as by nitrogfx.
+
+    Frames which point at the same result share a single entry in `animationResults`, ordered by
+    the offset of the result in the file.
+
+    Arguments:
+    data -- buffer holding the full NANR file
+    """
+    chunks = nitro.chunks(data, b"RNAN")
+    abnk = chunks[b"KNBA"]
+    label_enabled = len(chunks) != 1
+
+    (seq_count, frame_count, seq_offset, frame_offset, data_offset) = struct.unpack_from(
+        "<HHIII", abnk, 0
+    )
+    frames = abnk[frame_offset:]
+    frame_data = abnk[data_offset:]
+
+    raw_sequences = []
+    result_types: dict[int, int] = {}
+    for (
+        seq_frame_count,
+        loop_start,
+        element,
+        anim_type,
+        playback_mode,
+        seq_frames_offset,
+    ) in struct.iter_unpack("<HHHHII", abnk[seq_offset : seq_offset + 16 * seq_count]):
+        seq_frames = [
+            struct.unpack_from("<IH", frames, seq_frames_offset + 8 * j)
+            for j in range(seq_frame_count)
+        ]
+        for result_offset, _ in seq_frames:
+            result_types.setdefault(result_offset, element)
+
+        raw_sequences.append(
+            (seq_frame_count, loop_start, element, anim_type, playback_mode, seq_frames)
+        )
+
+    result_ids = {offset: i for i, offset in enumerate(sorted(result_types))}
+    sequences = [
+        {
+            "frameCount": seq_frame_count,
+            "loopStartFrame": loop_start,
+            "animationElement": element,
+            "animationType": anim_type,
+            "playbackMode": playback_mode,
+            "frameData": [
+                {"frameDelay": delay, "resultId": result_ids[result_offset]}
+                for (result_offset, delay) in seq_frames
+            ],
+        }
+        for (
+            seq_frame_count,
+            loop_start,
+            element,
+            anim_type,
+            playback_mode,
+            seq_frames,
+        ) in raw_sequences
+    ]
+
+    nanr = {
+        "labelEnabled": label_enabled,
+        "sequenceCount": seq_count,
+        "frameCount": frame_count,
+        "sequences": sequences,
+        "animationResults": [
+            _result(frame_data, offset, result_types[offset]) for offset in sorted(result_types)
+        ],
+        "resultCount": len(result_types),
+    }
+
+    if label_enabled:
+        labels = nitro.read_labels(chunks[b"LBAL"]) if b"LBAL" in chunks else []
+        nanr |= {"labels": labels, "labelCount": len(labels)}
+
+    return nitro.print_cjson(nanr)
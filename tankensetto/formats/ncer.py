@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import struct
+
+from tankensetto.formats import nitro
+
+
+def _oam(attr0: int, attr1: int, attr2: int) -> dict:
+    return {
+        "Attr0": {
+            "YCoordinate": attr0 & 0xFF,
+            "Rotation": bool((attr0 >> 8) & 1),
+            "SizeDisable": bool((attr0 >> 9) & 1),
+            "Mode": (attr0 >> 10) & 3,
+            "Mosaic": bool((attr0 >> 12) & 1),
+            "Colours": 256 if (attr0 >> 13) & 1 else 16,
+            "Shape": (attr0 >> 14) & 3,
+        },
+        "Attr1": {
+            "XCoordinate": attr1 & 0x1FF,
+            "RotationScaling": (attr1 >> 9) & 0x1F,
+            "Size": (attr1 >> 14) & 3,
+        },
+        "Attr2": {
+            "CharName": attr2 & 0x3FF,
+            "Priority": (attr2 >> 10) & 3,
+            "Palette": (attr2 >> 12) & 0xF,
+        },
+    }
+
+
+def to_json(data: bytes | memoryview) -> str:
+    """
+    Convert an NCER to JSON, laid out as by nitrogfx.
+
+    Arguments:
+    data -- buffer holding the full NCER file
+    """
+    chunks = nitro.chunks(data, b"RECN")
+    cebk = chunks[b"KBEC"]
+    label_enabled = len(chunks) != 1
+
+    (cell_count, bank_attr, cells_offset, mapping_type) = struct.unpack_from("<HHII", cebk, 0)
+    extended = bank_attr == 1
+    cell_size = 0x10 if extended else 0x08
+    cells_data = cebk[cells_offset:]
+    oam_data = cells_data[cell_count * cell_size :]
+
+    cells = []
+    oam_index = 0
+    for i in range(cell_count):
+        (oam_count, attrs) = struct.unpack_from("<HH", cells_data, i * cell_size)
+        cell: dict = {
+            "cellAttrs": {
+                "hFlip": bool((attrs >> 8) & 1),
+                "vFlip": bool((attrs >> 9) & 1),
+                "hvFlip": bool((attrs >> 10) & 1),
+                "boundingRect": bool((attrs >> 11) & 1),
+                "boundingSphereRadius": attrs & 0x3F,
+            },
+        }
+
+        if extended:
+            (max_x, max_y, min_x, min_y) = struct.unpack_from(
+                "<hhhh", cells_data, i * cell_size + 8
+            )
+            cell |= {"maxX": max_x, "maxY": max_y, "minX": min_x, "minY": min_y}
+
+        cell["OAM"] = [
+            _oam(*struct.unpack_from("<HHH", oam_data, 6 * j))
+            for j in range(oam_index, oam_index + oam_count)
+        ]
+        oam_index += oam_count
+        cells.append(cell)
+
+    ncer = {
+        "labelEnabled": label_enabled,
+        "extended": extended,
+        "cellCount": cell_count,
+        "mappingType": mapping_type,
+        "cells": cells,
+    }
+
+    if label_enabled:
+        labels = nitro.read_labels(chunks[b"LBAL"]) if b"LBAL" in chunks else []
+        ncer |= {"labels": labels, "labelCount": len(labels)}
+
+    return nitro.print_cjson(ncer)
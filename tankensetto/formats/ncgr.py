@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import dataclasses
+import struct
+
+from tankensetto.formats import scramble
+
+TILE_DIM = 8
+
+# Nitro packs the leftmost pixel of each pair into the low nibble; PNG expects it in the high one.
+NIBBLE_SWAP = bytes(((b & 0x0F) << 4) | (b >> 4) for b in range(256))
+
+
+@dataclasses.dataclass
+class NCGR:
+    """
+    Character data and layout parameters from an NCGR's CHAR chunk.
+    """
+
+    bitdepth: int
+    tile_rows: int
+    tile_cols: int
+    scanned: bool
+    data: memoryview
+
+    @classmethod
+    def parse(cls, data: bytes | memoryview) -> "NCGR":
+        """
+        Parse an NCGR file.
+
+        Arguments:
+        data -- buffer holding the full NCGR file
+        """
+        view = memoryview(data)
+        if bytes(view[0:4]) != b"RGCN":
+            raise ValueError("not a valid NCGR")
+        if bytes(view[0x10:0x14]) != b"RAHC":
+            raise ValueError("no CHAR chunk after NCGR header")
+
+        (rows, cols, bitdepth, _, scanned, size, offset) = struct.unpack_from(
+            "<hhIIIII", view, 0x18
+        )
+        start = 0x18 + offset
+        return cls(
+            bitdepth=4 if bitdepth == 3 else 8,
+            tile_rows=rows,
+            tile_cols=cols,
+            scanned=bool(scanned & 0xFF),
+            data=view[start : start + size],
+        )
+
+    @property
+    def tile_size(self) -> int:
+        return TILE_DIM * self.bitdepth
+
+    @property
+    def num_tiles(self) -> int:
+        return len(self.data) // self.tile_size
+
+
+def to_rows(
+    ncgr: NCGR,
+    tiles_width: int = 0,
+    scan_front_to_back: bool = False,
+    handle_empty: bool = False,
+) -> tuple[int, int, bytes]:
+    """
+    Lay out an NCGR's character data as packed, PNG-ordered pixel rows.
+
+    Returns the width and height of the image in pixels alongside the row data.
+
+    Arguments:
+    ncgr -- parsed NCGR
+    tiles_width -- width of the image in tiles; if 0, then taken from the NCGR header
+    scan_front_to_back -- direction in which to descramble scanned character data
+    handle_empty -- if True, then an NCGR with no character data yields a blank image sized per
+        its header instead of an error
+    """
+    if tiles_width == 0:
+        tiles_width = ncgr.tile_cols if ncgr.tile_cols > 0 else 1
+
+    num_tiles = ncgr.num_tiles
+    if num_tiles == 0:
+        if not handle_empty:
+            raise ValueError("NCGR has no character data")
+
+        tiles_height = max(ncgr.tile_rows, 1)
+        width = tiles_width * TILE_DIM
+        height = tiles_height * TILE_DIM
+        return (width, height, bytes(width * height * ncgr.bitdepth // 8))
+
+    tiles_height = (num_tiles + tiles_width - 1) // tiles_width
+    width = tiles_width * TILE_DIM
+    height = tiles_height * TILE_DIM
+    size = width * height * ncgr.bitdepth // 8
+
+    if ncgr.scanned:
+        pixels = scramble.descramble(ncgr.data, scan_front_to_back)
+    else:
+        pixels = _untile(ncgr.data, ncgr.bitdepth, tiles_width, tiles_height)
+
+    pixels = pixels.ljust(size, b"\x00")[:size]
+    if ncgr.bitdepth == 4:
+        pixels = pixels.translate(NIBBLE_SWAP)
+
+    return (width, height, pixels)
+
+
+def _untile(data: memoryview, bitdepth: int, tiles_width: int, tiles_height: int) -> bytes:
+    tile_size = TILE_DIM * bitdepth
+    row_size = bitdepth
+    data = bytes(data).ljust(tiles_width * tiles_height * tile_size, b"\x00")
+
+    return b"".join(
+        data[tile + r * row_size : tile + (r + 1) * row_size]
+        for ty in range(tiles_height)
+        for r in range(TILE_DIM)
+        for tile in range(
+            ty * tiles_width * tile_size, (ty + 1) * tiles_width * tile_size, tile_size
+        )
+    )
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import dataclasses
+import hashlib
+import struct
+
+Color = tuple[int, int, int]
+
+# BGR555 channels are 5 bits wide; scale each to 8 bits the same way nitrogfx does.
+_UPCONVERT = [(c * 255) // 31 for c in range(32)]
+
+
+def bgr555_to_rgb(value: int) -> Color:
+    return (
+        _UPCONVERT[value & 0x1F],
+        _UPCONVERT[(value >> 5) & 0x1F],
+        _UPCONVERT[(value >> 10) & 0x1F],
+    )
+
+
+@dataclasses.dataclass(frozen=True)
+class Palette:
+    """
+    Colors from an NCLR's PLTT chunk as 8-bit RGB triples.
+    """
+
+    bitdepth: int
+    colors: tuple[Color, ...]
+
+    def bank(self, index: int, count: int) -> list[Color]:
+        """
+        Select `count` colors starting at the given 16-color bank, padding with black as needed.
+
+        Arguments:
+        index -- 0-based index of the first 16-color bank
+        count -- number of colors to select
+        """
+        colors = list(self.colors[16 * index : 16 * index + count])
+        colors.extend([(0, 0, 0)] * (count - len(colors)))
+        return colors
+
+    def to_jasc(self, bitdepth: int = 0) -> bytes:
+        """
+        Render the palette as a JASC PAL file.
+
+        As with nitrogfx, every color in the source palette is written; `bitdepth` is validated for
+        compatibility with the nitrogfx command line.
+
+        Arguments:
+        bitdepth -- bitdepth for the palette; 0, 4, or 8
+        """
+        if bitdepth not in (0, 4, 8):
+            raise ValueError(f"bitdepth must be 4 or 8, not {bitdepth}")
+
+        lines = ["JASC-PAL", "0100", str(len(self.colors))]
+        lines.extend(f"{r} {g} {b}" for (r, g, b) in self.colors)
+        return "".join(f"{line}\r\n" for line in lines).encode("ascii")
+
+
+_PALETTES: dict[bytes, Palette] = {}
+
+
+def load(data: bytes | memoryview) -> Palette:
+    """
+    Parse an NCLR file, reusing the result for any identical file seen before.
+
+    Arguments:
+    data -- buffer holding the full NCLR file
+    """
+    digest = hashlib.sha1(data).digest()
+    if (palette := _PALETTES.get(digest)) is None:
+        palette = _PALETTES[digest] = parse(data)
+
+    return palette
+
+
+def parse(data: bytes | memoryview) -> Palette:
+    """
+    Parse an NCLR file.
+
+    Arguments:
+    data -- buffer holding the full NCLR file
+    """
+    if bytes(data[0:4]) not in (b"RLCN", b"RPCN"):
+        raise ValueError("not a valid NCLR or NCPR palette")
+    if bytes(data[0x10:0x14]) != b"TTLP":
+        raise ValueError("no PLTT chunk after NCLR header")
+
+    (bitdepth, _, size) = struct.unpack_from("<III", data, 0x18)
+    colors = data[0x28 : 0x28 + size]
+    return Palette(
+        bitdepth=4 if bitdepth == 3 else 8,
+        colors=tuple(
+            bgr555_to_rgb(c) for (c,) in struct.iter_unpack("<H", colors[: len(colors) & ~1])
+        ),
+    )
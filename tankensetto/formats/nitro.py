@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import struct
+
+HEADER_SIZE = 0x10
+
+
+def chunks(data: bytes | memoryview, magic: bytes) -> dict[bytes, memoryview]:
+    """
+    Split a generic Nitro file into its chunks, keyed by (byte-reversed) chunk magic.
+
+    Each chunk's view excludes its 8-byte magic and size header.
+
+    Arguments:
+    data -- buffer holding the full file
+    magic -- expected file magic, as stored
+    """
+    view = memoryview(data)
+    if bytes(view[0:4]) != magic:
+        raise ValueError(f"bad magic; expected {magic!r}, got {bytes(view[0:4])!r}")
+
+    (header_size, num_chunks) = struct.unpack_from("<HH", view, 0x0C)
+    found = {}
+    offset = header_size
+    for _ in range(num_chunks):
+        (chunk_magic, chunk_size) = struct.unpack_from("<4sI", view, offset)
+        found[chunk_magic] = view[offset + 8 : offset + chunk_size]
+        offset += chunk_size
+
+    return found
+
+
+def read_labels(lbal: memoryview) -> list[str]:
+    """
+    Read the label strings from an LBAL chunk.
+
+    The chunk is a table of offsets followed by the NUL-terminated strings they point at; the table
+    ends at the first entry which cannot be an offset into the remaining space.
+
+    Arguments:
+    lbal -- body of the LBAL chunk
+    """
+    offsets = []
+    for (value,) in struct.iter_unpack("<I", lbal[: len(lbal) & ~3]):
+        if value >= len(lbal) - 4 * (len(offsets) + 1):
+            break
+        offsets.append(value)
+
+    strings = bytes(lbal[4 * len(offsets) :])
+    return [strings[o : strings.index(b"\x00", o)].decode("ascii") for o in offsets]
+
+
+def print_cjson(value, depth: int = 0) -> str:
+    """
+    Serialize a value exactly as cJSON_Print would, as used by nitrogfx for its JSON outputs.
+
+    Arguments:
+    value -- dict, list, str, bool, or int to be serialized
+    depth -- current nesting depth
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, list):
+        return "[" + ", ".join(print_cjson(v, depth + 1) for v in value) + "]"
+
+    items = [
+        "\t" * (depth + 1) + f"{json.dumps(k)}:\t{print_cjson(v, depth + 1)}"
+        for (k, v) in value.items()
+    ]
+    return (
+        "{\n"
+        + "".join(f"{item},\n" for item in items[:-1])
+        + (f"{items[-1]}\n" if items else "")
+        + "\t" * depth
+        + "}"
+    )
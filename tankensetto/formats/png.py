@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import struct
+import zlib
+
+from tankensetto.formats.nclr import Color
+
+SIGNATURE = b"\x89PNG\r\n\x1a\n"
+COLOR_TYPE_INDEXED = 3
+
+# Pinned, rather than left to zlib's default, so that the same image always encodes to the same
+# bytes and unchanged outputs are recognized as such.
+COMPRESSION_LEVEL = 6
+
+
+def _chunk(kind: bytes, body: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(body))
+        + kind
+        + body
+        + struct.pack(">I", zlib.crc32(body, zlib.crc32(kind)))
+    )
+
+
+def encode_indexed(
+    width: int,
+    height: int,
+    bitdepth: int,
+    palette: list[Color],
+    rows: bytes,
+) -> bytes:
+    """
+    Encode an indexed-color PNG.
+
+    The output depends only on the inputs, so encoding the same image twice yields the same bytes.
+
+    Arguments:
+    width -- width of the image in pixels
+    height -- height of the image in pixels
+    bitdepth -- bits per pixel; 4 or 8
+    palette -- RGB colors to be written as the PLTE chunk
+    rows -- packed pixel rows, leftmost pixel in the high bits of each byte
+    """
+    stride = (width * bitdepth + 7) // 8
+    raw = b"".join(b"\x00" + rows[y * stride : (y + 1) * stride] for y in range(height))
+
+    return b"".join(
+        [
+            SIGNATURE,
+            _chunk(
+                b"IHDR",
+                struct.pack(">IIBBBBB", width, height, bitdepth, COLOR_TYPE_INDEXED, 0, 0, 0),
+            ),
+            _chunk(b"PLTE", b"".join(bytes(color) for color in palette)),
+            _chunk(b"IDAT", zlib.compress(raw, COMPRESSION_LEVEL)),
+            _chunk(b"IEND", b""),
+        ]
+    )
+
+
+def _paeth(a: int, b: int, c: int) -> int:
+    p = a + b - c
+    (pa, pb, pc) = (abs(p - a), abs(p - b), abs(p - c))
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def _unfilter(raw: bytes, height: int, stride: int) -> bytes:
+    # Indexed pixels never span more than one byte, so each byte's left neighbor is the one before.
+    rows = bytearray()
+    prev = bytearray(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        kind = raw[start]
+        row = bytearray(raw[start + 1 : start + 1 + stride])
+        if kind == 1:
+            for x in range(1, stride):
+                row[x] = (row[x] + row[x - 1]) & 0xFF
+        elif kind == 2:
+            for x in range(stride):
+                row[x] = (row[x] + prev[x]) & 0xFF
+        elif kind == 3:
+            for x in range(stride):
+                left = row[x - 1] if x else 0
+                row[x] = (row[x] + ((left + prev[x]) >> 1)) & 0xFF
+        elif kind == 4:
+            for x in range(stride):
+                (left, upleft) = (row[x - 1], prev[x - 1]) if x else (0, 0)
+                row[x] = (row[x] + _paeth(left, prev[x], upleft)) & 0xFF
+        elif kind != 0:
+            raise ValueError(f"unknown PNG filter type {kind}")
+
+        rows += row
+        prev = row
+
+    return bytes(rows)
+
+
+def decode_indexed(data: bytes) -> tuple[int, int, int, list[Color], bytes]:
+    """
+    Decode an indexed-color PNG, whether written by `encode_indexed` or by another encoder.
+
+    Returns the width, height, bitdepth, palette, and packed pixel rows, in the same form as
+    `encode_indexed` takes them.
+
+    Arguments:
+    data -- full contents of the PNG file
+    """
+    if data[:8] != SIGNATURE:
+        raise ValueError("not a PNG")
+
+    header = None
+    palette: list[Color] = []
+    idat = []
+    offset = len(SIGNATURE)
+    while offset < len(data):
+        (length, kind) = struct.unpack_from(">I4s", data, offset)
+        body = data[offset + 8 : offset + 8 + length]
+        offset += 12 + length
+
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif kind == b"PLTE":
+            palette = [(body[i], body[i + 1], body[i + 2]) for i in range(0, len(body) - 2, 3)]
+        elif kind == b"IDAT":
+            idat.append(body)
+        elif kind == b"IEND":
+            break
+
+    if header is None:
+        raise ValueError("no IHDR chunk in PNG")
+
+    (width, height, bitdepth, color_type, _, _, interlace) = header
+    if color_type != COLOR_TYPE_INDEXED or interlace:
+        raise ValueError("only non-interlaced indexed-color PNGs are supported")
+
+    stride = (width * bitdepth + 7) // 8
+    raw = zlib.decompress(b"".join(idat))
+    if len(raw) != height * (stride + 1):
+        raise ValueError(f"PNG image data is {len(raw)} bytes; expected {height * (stride + 1)}")
+
+    rows = _unfilter(raw, height, stride)
+    return (width, height, bitdepth, palette, rows)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import dataclasses
+import struct
+import typing
+
+
+@dataclasses.dataclass(frozen=True)
+class Field:
+    """
+    A single named field within a record.
+
+    Fields with a count greater than 1 hold that many consecutive values of their type, and are
+    read as tuples.
+    """
+
+    name: str
+    code: str
+    count: int
+    offset: int
+    struct: struct.Struct
+
+    def read(self, buffer: memoryview, offset: int = 0):
+        values = self.struct.unpack_from(buffer, offset + self.offset)
+        return values if self.count > 1 else values[0]
+
+
+class Layout:
+    """
+    Declarative description of a fixed-size, little-Endian record in a ROM table.
+    """
+
+    def __init__(self, *fields: tuple[str, str]) -> None:
+        """
+        Constructor.
+
+        Arguments:
+        fields -- (name, format) for each field, in order; format is a `struct` type code, with an
+            optional leading repeat count, e.g. "B" or "40b"
+        """
+        self.struct = struct.Struct("<" + "".join(code for (_, code) in fields))
+        self.size = self.struct.size
+        self.fields: dict[str, Field] = {}
+
+        offset = 0
+        for name, code in fields:
+            field_struct = struct.Struct(f"<{code}")
+            count = len(field_struct.unpack(bytes(field_struct.size)))
+            self.fields[name] = Field(name, code, count, offset, field_struct)
+            offset += field_struct.size
+
+    def column_struct(self, name: str) -> struct.Struct:
+        """
+        Get a struct which reads a whole record, but yields only the values of the named field.
+        """
+        field = self.fields[name]
+        after = self.size - field.offset - field.struct.size
+        return struct.Struct(f"<{field.offset}x{field.code}{after}x")
+
+
+class Record:
+    """
+    Lazy view of a single record within a buffer; fields are decoded only when accessed.
+    """
+
+    def __init__(self, layout: Layout, buffer: memoryview, offset: int) -> None:
+        self._layout = layout
+        self._buffer = buffer
+        self._offset = offset
+
+    def __getattr__(self, name: str):
+        try:
+            field = self._layout.fields[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+        return field.read(self._buffer, self._offset)
+
+    def unpack(self) -> dict[str, typing.Any]:
+        """
+        Decode every field of the record at once.
+        """
+        return {name: f.read(self._buffer, self._offset) for name, f in self._layout.fields.items()}
+
+
+class Table:
+    """
+    Zero-copy view of a contiguous table of fixed-size records.
+    """
+
+    def __init__(
+        self,
+        layout: Layout,
+        data: bytes | bytearray | memoryview,
+        count: int | None = None,
+    ) -> None:
+        """
+        Constructor.
+
+        Arguments:
+        layout -- layout of each record
+        data -- buffer beginning at the first record
+        count -- number of records in the table; by default, as many as fit in the buffer
+        """
+        capacity = len(data) // layout.size
+        if count is None:
+            count = capacity
+        elif count > capacity:
+            raise ValueError(f"table of {count} records does not fit in {len(data)} bytes")
+
+        self.layout = layout
+        self.view = memoryview(data)[: count * layout.size]
+
+    def __len__(self) -> int:
+        return len(self.view) // self.layout.size
+
+    def __getitem__(self, i: int) -> Record:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+
+        return Record(self.layout, self.view, i * self.layout.size)
+
+    def __iter__(self) -> typing.Iterator[Record]:
+        for offset in range(0, len(self.view), self.layout.size):
+            yield Record(self.layout, self.view, offset)
+
+    def column(self, name: str) -> list:
+        """
+        Decode one field from every record in the table in a single pass.
+
+        Arguments:
+        name -- name of the field
+        """
+        values = self.layout.column_struct(name).iter_unpack(self.view)
+        if self.layout.fields[name].count > 1:
+            return list(values)
+
+        return [v for (v,) in values]
+
+    def columns(self, *names: str) -> dict[str, list]:
+        """
+        Decode the given fields, or every field, from every record in the table.
+        """
+        return {name: self.column(name) for name in names or self.layout.fields}
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import array
+import functools
+import sys
+
+LCG_MULT = 1103515245
+LCG_INC = 24691
+LCG_PERIOD = 0x10000
+
+# Split a packed 4bpp byte into its left (low nibble) and right (high nibble) pixels.
+_LEFT_PIXEL = bytes(b & 0x0F for b in range(256))
+_RIGHT_PIXEL = bytes(b >> 4 for b in range(256))
+
+
+@functools.cache
+def _orbit() -> tuple[array.array, array.array]:
+    """
+    Walk the full cycle of the key generator once.
+
+    Only the low 16 bits of each state are ever used as a key, and those bits evolve as an LCG
+    modulo 2^16 with full period. Every key stream is therefore a contiguous run of this one cycle,
+    starting at the position of its seed.
+
+    Returns the cycle (doubled, so that any run can be sliced without wrapping) and the position of
+    each seed within it.
+    """
+    orbit = array.array("H", bytes(2 * LCG_PERIOD))
+    position = array.array("L", bytes(array.array("L").itemsize * LCG_PERIOD))
+
+    state = 0
+    for i in range(LCG_PERIOD):
+        orbit[i] = state
+        position[state] = i
+        state = (state * LCG_MULT + LCG_INC) & 0xFFFF
+
+    orbit[LCG_PERIOD:] = orbit[:LCG_PERIOD]
+    return (orbit, position)
+
+
+def keystream(seed: int, length: int) -> array.array:
+    """
+    Generate the first `length` keys for the given seed.
+
+    Arguments:
+    seed -- initial state of the key generator
+    length -- number of 16-bit keys to generate
+    """
+    (orbit, position) = _orbit()
+    start = position[seed & 0xFFFF]
+    if length <= LCG_PERIOD:
+        return orbit[start : start + length]
+
+    cycle = orbit[start : start + LCG_PERIOD]
+    return (cycle * (length // LCG_PERIOD + 1))[:length]
+
+
+def descramble(data: bytes | memoryview, front_to_back: bool) -> bytes:
+    """
+    Undo the PRNG obfuscation applied to scanned character data in a single batched pass.
+
+    Arguments:
+    data -- scrambled character data
+    front_to_back -- if True, seed from the first halfword and walk forwards (Platinum);
+        otherwise, seed from the last halfword and walk backwards (Diamond/Pearl)
+    """
+    count = len(data) // 2
+    if count == 0:
+        return bytes(data)
+
+    if front_to_back:
+        seed = data[0] | (data[1] << 8)
+        keys = keystream(seed, count)
+    else:
+        seed = data[2 * count - 2] | (data[2 * count - 1] << 8)
+        keys = keystream(seed, count)
+        keys.reverse()
+
+    if sys.byteorder == "big":
+        keys.byteswap()
+
+    body = int.from_bytes(data[: 2 * count], "little") ^ int.from_bytes(keys.tobytes(), "little")
+    return body.to_bytes(2 * count, "little") + bytes(data[2 * count :])
+
+
+def expand_4bpp(packed: bytes) -> array.array:
+    """
+    Expand packed 4bpp pixel data in Nitro nibble order to one palette index per pixel.
+
+    Arguments:
+    packed -- pixel data, leftmost pixel of each pair in the low nibble
+    """
+    pixels = bytearray(2 * len(packed))
+    pixels[0::2] = packed.translate(_LEFT_PIXEL)
+    pixels[1::2] = packed.translate(_RIGHT_PIXEL)
+    return array.array("B", pixels)
+
+
+def decode_pixels(data: bytes | memoryview, bitdepth: int, front_to_back: bool) -> array.array:
+    """
+    Descramble character data and return it as an array of palette indices, one per pixel, in
+    scan order.
+
+    Arguments:
+    data -- scrambled character data
+    bitdepth -- bits per pixel; 4 or 8
+    front_to_back -- direction in which to descramble
+    """
+    plain = descramble(data, front_to_back)
+    if bitdepth == 4:
+        return expand_4bpp(plain)
+    return array.array("B", plain)
@@ -0,0 +1,350 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import dataclasses
+import hashlib
+import pathlib
+import sqlite3
+import struct
+import typing
+
+from tankensetto import romcache, tracing
+from tankensetto.tools.narc import NARCArchive
+from tankensetto.tools.nds import NATIVE_NDS, NDSImage
+
+# Bumped whenever what is recorded changes, so that older indexes of a ROM are rebuilt.
+VERSION = 2
+
+# Formats recognized by their magic, named as they are in the pret projects.
+MAGICS = {
+    b"RGCN": "NCGR",
+    b"RLCN": "NCLR",
+    b"RECN": "NCER",
+    b"RNAN": "NANR",
+    b"NARC": "NARC",
+}
+LZ = "LZ"
+RAW = "raw"
+FORMATS = (*MAGICS.values(), LZ, RAW)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS roms (
+    sha1 TEXT PRIMARY KEY,
+    game_code TEXT NOT NULL,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    rom TEXT NOT NULL,
+    path TEXT NOT NULL,
+    member INTEGER,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    format TEXT NOT NULL,
+    sha1 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_by_path ON files (rom, path, member);
+CREATE INDEX IF NOT EXISTS files_by_format ON files (rom, format);
+"""
+
+COLUMNS = "path, member, offset, size, format, sha1"
+
+
+@dataclasses.dataclass(frozen=True)
+class Entry:
+    """
+    A file of the ROM, or a member of one of its NARCs.
+
+    Paths are relative to the ROM's extraction directory, e.g. "filesys/poketool/icongra/
+    pl_poke_icon.narc"; offsets are from the start of the ROM.
+    """
+
+    path: str
+    member: int | None
+    offset: int
+    size: int
+    format: str
+    sha1: str
+
+    @property
+    def name(self) -> str:
+        return self.path if self.member is None else f"{self.path}[{self.member}]"
+
+    def line(self) -> str:
+        return f"{self.offset:#010x} {self.size:>9} {self.format:<4} {self.name}"
+
+
+def detect(data: bytes) -> str:
+    """
+    Name the format of a file by its magic.
+
+    LZ-compressed files have no magic of their own; they are recognized by their header's type
+    byte, along with a token stream which decompresses to exactly the size the header gives.
+
+    Arguments:
+    data -- full contents of the file
+    """
+    if (name := MAGICS.get(data[:4])) is not None:
+        return name
+
+    if len(data) >= 4 and data[0] in (0x10, 0x11):
+        (size,) = struct.unpack("<I", data[1:4] + b"\0")
+        # LZ10 expands its input by at most 1/8 again, plus the header, and shrinks it to no less
+        # than 17 bytes for every 144; only then is the stream worth walking.
+        lz10_bounds = (len(data) - 4) * 144 // 17 + 18 >= size and size * 9 // 8 + 8 >= len(data)
+        if size and (data[0] == 0x11 or lz10_bounds) and _lz_fits(data, size):
+            return LZ
+
+    return RAW
+
+
+def _lz_fits(data: bytes, size: int) -> bool:
+    """
+    Walk the tokens of an LZ10 or LZ11 stream, without decompressing it, to check that it is
+    well-formed and produces exactly `size` bytes.
+
+    No token may reach back before the start of the output, and the stream may be followed by no
+    more than the padding which aligns it to 4 bytes.
+    """
+    lz11 = data[0] == 0x11
+    (pos, produced) = (4, 0)
+    while produced < size:
+        if pos >= len(data):
+            return False
+
+        flags = data[pos]
+        pos += 1
+        for bit in range(8):
+            if produced >= size:
+                break
+
+            if not flags & (0x80 >> bit):
+                if pos >= len(data):
+                    return False
+                (pos, produced) = (pos + 1, produced + 1)
+                continue
+
+            if pos + 2 > len(data):
+                return False
+
+            (b0, b1) = (data[pos], data[pos + 1])
+            if not lz11 or b0 >> 4 > 1:
+                length = (b0 >> 4) + (3 if not lz11 else 1)
+                disp = ((b0 & 0xF) << 8) | b1
+                pos += 2
+            elif b0 >> 4 == 0:
+                if pos + 3 > len(data):
+                    return False
+                length = (((b0 & 0xF) << 4) | (b1 >> 4)) + 0x11
+                disp = ((b1 & 0xF) << 8) | data[pos + 2]
+                pos += 3
+            else:
+                if pos + 4 > len(data):
+                    return False
+                length = (((b0 & 0xF) << 12) | (b1 << 4) | (data[pos + 2] >> 4)) + 0x111
+                disp = ((data[pos + 2] & 0xF) << 8) | data[pos + 3]
+                pos += 4
+
+            if disp >= produced:
+                return False
+            produced += length
+
+    return produced == size and len(data) - pos < 4
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def scan(rom: NDSImage) -> typing.Iterator[Entry]:
+    """
+    Describe every file of a ROM, laid out as `NDS.extract` would lay them out, and every member
+    of its NARCs.
+
+    Arguments:
+    rom -- the opened ROM
+    """
+    paths = [
+        *("header.bin", "arm9.bin", "arm7.bin", "y9.bin", "y7.bin", "banner.bin"),
+        *(f"overlay/overlay_{file_id:04}.bin" for file_id in rom.overlay_ids()),
+        *(f"filesys/{path}" for path in rom.paths),
+    ]
+
+    for path in paths:
+        (start, end) = rom.extent(path)
+        with rom.data[start:end] as view:
+            data = bytes(view)
+
+        format = detect(data)
+        yield Entry(path, None, start, len(data), format, _digest(data))
+        if format != "NARC":
+            continue
+
+        try:
+            archive = NARCArchive(data)
+        except (ValueError, struct.error):
+            continue
+
+        for i, (member_start, member_end) in enumerate(archive.extents):
+            member = data[member_start:member_end]
+            yield Entry(
+                path,
+                i,
+                start + member_start,
+                len(member),
+                detect(member),
+                _digest(member),
+            )
+
+
+class Index:
+    """
+    SQLite database describing the files and NARC members of every ROM it has been asked about.
+
+    Each ROM is scanned once, on first use, and is afterwards looked up by the SHA-1 of its
+    contents. The database sits next to the ROM cache.
+    """
+
+    def __init__(self, path: pathlib.Path | None = None) -> None:
+        """
+        Constructor; creates the database if it does not exist.
+
+        Arguments:
+        path -- path to the database; by default, `index.sqlite` in the cache directory
+        """
+        self.cache = romcache.ROMCache()
+        self.path = path or self.cache.root / "index.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=60)
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self) -> "Index":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def ensure(self, path_to_rom: pathlib.Path, force: bool = False) -> str:
+        """
+        Index a ROM, unless it has been indexed already.
+
+        Arguments:
+        path_to_rom -- path to the ROM file
+        force -- if True, index the ROM again even if it has been already
+
+        Returns the SHA-1 by which the ROM is known to the index.
+        """
+        sha1 = self.cache.identify(path_to_rom)
+        row = self.db.execute("SELECT version FROM roms WHERE sha1 = ?", (sha1,)).fetchone()
+        if row is None or row[0] != VERSION or force:
+            self.build(path_to_rom, sha1)
+
+        return sha1
+
+    def build(self, path_to_rom: pathlib.Path, sha1: str) -> None:
+        """
+        Scan a ROM and replace everything recorded about it.
+
+        Arguments:
+        path_to_rom -- path to the ROM file
+        sha1 -- SHA-1 of the ROM's contents
+        """
+        with tracing.span("index ROM", "stage"), NATIVE_NDS.open(path_to_rom) as rom:
+            rows = [(sha1, e.path, e.member, e.offset, e.size, e.format, e.sha1) for e in scan(rom)]
+            game_code = rom.game_code
+
+        with self.db:
+            self.db.execute("DELETE FROM files WHERE rom = ?", (sha1,))
+            self.db.execute("DELETE FROM roms WHERE sha1 = ?", (sha1,))
+            self.db.executemany(
+                f"INSERT INTO files (rom, {COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.db.execute("INSERT INTO roms VALUES (?, ?, ?)", (sha1, game_code, VERSION))
+
+    def ls(self, rom: str, prefix: str = "") -> list[Entry]:
+        """
+        List the members of the NARC at `prefix`, or else the file or directory of files there.
+
+        Arguments:
+        rom -- SHA-1 of an indexed ROM
+        prefix -- path to a NARC, file, or directory; if empty, every file is listed
+        """
+        prefix = prefix.strip("/")
+        members = self._select(
+            "WHERE rom = ? AND path = ? AND member IS NOT NULL ORDER BY member", rom, prefix
+        )
+        if members:
+            return members
+
+        if not prefix:
+            return self._select("WHERE rom = ? AND member IS NULL ORDER BY offset", rom)
+
+        return self._select(
+            "WHERE rom = ? AND member IS NULL AND (path = ? OR substr(path, 1, ?) = ?) "
+            "ORDER BY offset",
+            rom,
+            prefix,
+            len(prefix) + 1,
+            f"{prefix}/",
+        )
+
+    def find(
+        self,
+        rom: str,
+        format: str | None = None,
+        pattern: str | None = None,
+        changed_from: str | None = None,
+    ) -> list[Entry]:
+        """
+        Find files and NARC members matching every given condition.
+
+        Arguments:
+        rom -- SHA-1 of an indexed ROM
+        format -- one of FORMATS
+        pattern -- glob which the path must match, e.g. "filesys/poketool/*"
+        changed_from -- SHA-1 of another indexed ROM; only entries which are missing from it, or
+            differ from it, are found
+        """
+        conditions = ["f.rom = ?"]
+        params: list = [rom]
+        if format is not None:
+            conditions.append("f.format = ?")
+            params.append(format)
+        if pattern is not None:
+            conditions.append("f.path GLOB ?")
+            params.append(pattern)
+
+        join = ""
+        if changed_from is not None:
+            join = "LEFT JOIN files b ON b.rom = ? AND b.path = f.path AND b.member IS f.member"
+            params.insert(0, changed_from)
+            conditions.append("(b.sha1 IS NULL OR b.sha1 != f.sha1)")
+
+        columns = ", ".join(f"f.{column}" for column in COLUMNS.split(", "))
+        query = f"SELECT {columns} FROM files f {join} WHERE {' AND '.join(conditions)}"
+        return [
+            Entry(*row) for row in self.db.execute(f"{query} ORDER BY f.offset, f.member", params)
+        ]
+
+    def _select(self, where: str, *params) -> list[Entry]:
+        return [
+            Entry(*row) for row in self.db.execute(f"SELECT {COLUMNS} FROM files {where}", params)
+        ]
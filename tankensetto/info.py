@@ -17,32 +17,68 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import contextlib
 import pathlib
+import threading
+import typing
 
 import rich
-from rich.progress import (
-    BarColumn,
-    MofNCompleteColumn,
-    Progress,
-    TextColumn,
-    TimeElapsedColumn,
-    TimeRemainingColumn,
-)
 
 from tankensetto import tools
 
+if typing.TYPE_CHECKING:
+    from rich.progress import Progress
 
-def progress() -> Progress: 
-    return Progress(
-        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-        BarColumn(),
-        MofNCompleteColumn(),
-        TextColumn("•"),
-        TimeElapsedColumn(),
-        TextColumn("•"),
-        TimeRemainingColumn(),
+
+_shared_progress: "Progress | None" = None
+_shared_users = 0
+_shared_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def progress() -> typing.Iterator["Progress"]:
+    """
+    Open a progress display, or join the one already open.
+
+    rich permits only one live display at a time, so extractors running concurrently add their
+    tasks to a single shared display, which stops once its last user is done with it.
+    """
+    global _shared_progress, _shared_users
+
+    from rich.progress import (
+        BarColumn,
+        MofNCompleteColumn,
+        Progress,
+        TextColumn,
+        TimeElapsedColumn,
+        TimeRemainingColumn,
     )
 
+    with _shared_lock:
+        if _shared_progress is None:
+            _shared_progress = Progress(
+                TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+                BarColumn(),
+                MofNCompleteColumn(),
+                TextColumn("•"),
+                TimeElapsedColumn(),
+                TextColumn("•"),
+                TimeRemainingColumn(),
+            )
+            _shared_progress.start()
+
+        _shared_users += 1
+        p = _shared_progress
+
+    try:
+        yield p
+    finally:
+        with _shared_lock:
+            _shared_users -= 1
+            if _shared_users == 0:
+                p.stop()
+                _shared_progress = None
+
 
 def echo_result(result: tools.Result, src: str | pathlib.Path, dir: str | pathlib.Path) -> None:
     if result == tools.Result.UNPACK_EXISTS:
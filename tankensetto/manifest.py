@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import dataclasses
+import importlib.resources
+import json
+import pathlib
+import typing
+
+import click
+import rich
+
+from tankensetto import cache, extractors, romcache
+from tankensetto.constants.narc_path import NARCPath
+from tankensetto.extractors import EXTRACTORS
+from tankensetto.tools import gfx
+from tankensetto.tools.narc import NARCArchive
+from tankensetto.tools.nds import NATIVE_NDS
+
+VERSION = 1
+
+# Manifest of the unmodified game, shipped inside the package; only ever read.
+PACKAGED = importlib.resources.files("tankensetto") / "data" / "platinum.json"
+
+
+def default_path() -> pathlib.Path:
+    """
+    Where `main` writes the manifest of the unmodified game unless told otherwise, in the cache
+    directory.
+    """
+    return romcache.default_root() / "manifests" / "platinum.json"
+
+
+@dataclasses.dataclass
+class Changes:
+    """
+    The parts of a ROM's extractor inputs which differ from a baseline.
+    """
+
+    members: dict[NARCPath, set[int]]
+    regions: set[str]
+
+
+@dataclasses.dataclass
+class Manifest:
+    """
+    Content hashes of every extractor input in a ROM: each member of each NARC an extractor reads,
+    and each region it declares.
+    """
+
+    game_code: str
+    narcs: dict[str, list[str]]
+    regions: dict[str, str]
+
+    @classmethod
+    def load(cls, path: pathlib.Path | importlib.resources.abc.Traversable) -> "Manifest":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("version") != VERSION:
+            raise ValueError(f"{path}: unsupported manifest version {data.get('version')}")
+
+        return cls(data["game_code"], data["narcs"], data["regions"])
+
+    @classmethod
+    def default(cls) -> "Manifest | None":
+        """
+        Load the manifest of the unmodified game: the one this build ships, if any, or else the
+        one last written to `default_path()`.
+        """
+        if PACKAGED.is_file():
+            return cls.load(PACKAGED)
+
+        path = default_path()
+        return cls.load(path) if path.is_file() else None
+
+    def save(self, path: pathlib.Path) -> None:
+        path.write_text(
+            json.dumps({"version": VERSION, **dataclasses.asdict(self)}, indent=4),
+            encoding="utf-8",
+        )
+
+    def compare(
+        self,
+        archives: dict[NARCPath, NARCArchive],
+        regions: dict[str, bytes],
+    ) -> Changes:
+        """
+        Find the members and regions which differ from this manifest.
+
+        Members beyond the end of an archive in the manifest count as changed.
+
+        Arguments:
+        archives -- archives to compare, by NARC
+        regions -- contents of the regions to compare, by name
+        """
+        members = {}
+        for np, archive in archives.items():
+            baseline = self.narcs.get(np.name, [])
+            members[np] = {
+                i
+                for i, member in enumerate(archive)
+                if i >= len(baseline) or cache.digest(member) != baseline[i]
+            }
+
+        return Changes(
+            members,
+            {
+                name
+                for name, data in regions.items()
+                if cache.digest(data) != self.regions.get(name)
+            },
+        )
+
+
+def inputs(
+    extractor: extractors.Extractor,
+    rom_files: dict[pathlib.PurePath, gfx.Source],
+) -> tuple[dict[NARCPath, NARCArchive], dict[str, bytes]]:
+    """
+    Open every NARC an extractor reads and read every region it declares.
+
+    Arguments:
+    extractor -- the extractor whose inputs to read
+    rom_files -- files of the ROM, on disk or in memory, including those the extractor needs
+
+    Returns the archives by NARC and the contents of the regions by name.
+    """
+    archives = {
+        np: NARCArchive(gfx.read(rom_files[pathlib.PurePath("filesys") / np.value]))
+        for np in extractor.unpacks + extractor.opens
+    }
+    regions = {
+        region.name: gfx.read_range(rom_files[region.rom_file], region.offset, region.size)
+        for region in extractor.regions
+    }
+
+    return (archives, regions)
+
+
+def build(
+    path_to_rom: pathlib.Path,
+    assets: typing.Iterable[extractors.AssetExtractor],
+) -> Manifest:
+    """
+    Hash every input of the given extractors in a ROM.
+
+    Arguments:
+    path_to_rom -- path to the ROM file
+    assets -- extractors whose inputs to hash
+    """
+    assets = list(assets)
+    rom_files = NATIVE_NDS.read_files(path_to_rom, extractors.rom_files(assets))
+    with NATIVE_NDS.open(path_to_rom) as rom:
+        game_code = rom.game_code
+
+    narcs: dict[str, list[str]] = {}
+    regions: dict[str, str] = {}
+    for asset in assets:
+        (archives, contents) = inputs(EXTRACTORS[asset], rom_files)
+        narcs.update(
+            {np.name: [cache.digest(m) for m in archive] for np, archive in archives.items()}
+        )
+        regions.update({name: cache.digest(data) for name, data in contents.items()})
+
+    return Manifest(game_code, narcs, regions)
+
+
+@click.command()
+@click.help_option("-h", "--help")
+@click.argument("rom", type=pathlib.Path)
+@click.option(
+    "-o",
+    "--output",
+    type=pathlib.Path,
+    default=None,
+    help="Path to write the manifest to; by default, in the cache directory.",
+)
+def main(rom: pathlib.Path, output: pathlib.Path | None):
+    """
+    Write a manifest of content hashes for every extractor input in an unmodified ROM, against
+    which `tankensetto --changed-only` compares.
+    """
+    path = output or default_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    build(rom, extractors.AssetExtractor).save(path)
+    rich.print(f"[bold green]✓[/] Wrote manifest of [bold yellow]{rom.name}[/] to {path}")
+
+
+if __name__ == "__main__":
+    main()
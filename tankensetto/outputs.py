@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import pathlib
+import threading
+
+from tankensetto import tracing
+
+
+def write_bytes(path: pathlib.Path, data: bytes | memoryview) -> bool:
+    """
+    Write a file in the project, leaving it untouched if it already holds exactly these bytes.
+
+    Changed files are replaced in a single step, so that an interrupted run never leaves a partial
+    output behind, and a build watching the project only sees outputs whose contents differ.
+
+    Arguments:
+    path -- path to the output file
+    data -- full contents of the output file
+
+    Returns True if the file was written.
+    """
+    with tracing.span(path.name, "write", path=str(path), size=len(data)) as span:
+        if _holds(path, data):
+            span["unchanged"] = True
+            return False
+
+        temp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_native_id()}.tmp")
+        try:
+            with open(temp, "xb") as out:
+                out.write(data)
+            os.replace(temp, path)
+        except BaseException:
+            temp.unlink(missing_ok=True)
+            raise
+
+        return True
+
+
+def write_text(path: pathlib.Path, text: str) -> bool:
+    """
+    Write a UTF-8 text file in the project, leaving it untouched if its contents would not change.
+    """
+    return write_bytes(path, text.encode("utf-8"))
+
+
+def replace(rendered: pathlib.Path, path: pathlib.Path) -> bool:
+    """
+    Move a file rendered elsewhere, e.g. by an external tool, into place in the project, leaving
+    the project's copy untouched if it is identical. The rendered file is removed either way.
+
+    Arguments:
+    rendered -- path to the rendered file, on any filesystem
+    path -- path to the output file
+    """
+    try:
+        return write_bytes(path, rendered.read_bytes())
+    finally:
+        rendered.unlink(missing_ok=True)
+
+
+def _holds(path: pathlib.Path, data: bytes | memoryview) -> bool:
+    try:
+        if path.stat().st_size != len(data):
+            return False
+
+        return path.read_bytes() == data
+    except FileNotFoundError:
+        return False
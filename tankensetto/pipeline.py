@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import pathlib
+import typing
+
+from tankensetto import extractors, manifest, tracing, util
+from tankensetto.constants.narc_path import NARCPath
+from tankensetto.extractors import EXTRACTORS, AssetExtractor
+from tankensetto.tools.gfx import GFX, Source
+from tankensetto.tools.narc import (
+    NARC,
+    ArchiveMembers,
+    Members,
+    NARCArchive,
+    UnpackingMembers,
+)
+
+T = typing.TypeVar("T")
+
+
+async def traced(name: str, awaitable: typing.Awaitable[T]) -> T:
+    with tracing.span(name, "stage"):
+        return await awaitable
+
+
+async def run_extractors(
+    assets: tuple[AssetExtractor, ...],
+    narc: NARC,
+    gfx: GFX,
+    rom_files: dict[pathlib.PurePath, Source],
+    rom_contents: pathlib.Path | None,
+    project_root: pathlib.Path,
+    force: bool,
+    jobs: int,
+    baseline: manifest.Manifest | None = None,
+    conversions_file: pathlib.Path | None = None,
+    unpacked_all: typing.Callable[[], None] | None = None,
+):
+    """
+    Run the given extractors as a graph of stages built from their declared inputs and outputs.
+
+    Every NARC any extractor needs is unpacked or opened exactly once, with all of them in flight
+    together. Each extractor starts as soon as its own NARCs are ready and any extractor touching
+    the same project files has finished; independent extractors run concurrently.
+
+    NARCs are unpacked under `rom_contents` in the background, and extractors are handed their
+    members straight away: looking up a member waits only until that member is written, so the
+    first conversions overlap with unpacking the rest. Once every NARC is unpacked, `unpacked_all`
+    is called, if given. NARCs already unpacked under `rom_contents` are used as they are, unless
+    forced.
+
+    If `rom_contents` is None, nothing is written outside the project: NARCs to be unpacked are
+    parsed in memory instead.
+
+    If a conversions file is given, finished conversions are recorded there, and later runs skip
+    those whose outputs are still up to date.
+
+    If a baseline manifest is given, each extractor's inputs are compared against it while the
+    NARCs are unpacked, and the extractor is told which of them changed.
+    """
+
+    def open_narc(np: NARCPath) -> NARCArchive:
+        source = rom_files[pathlib.PurePath("filesys") / np.value]
+        return NARCArchive.load(source) if isinstance(source, pathlib.Path) else NARCArchive(source)
+
+    unpacking: list[asyncio.Task] = []
+
+    async def unpack_in_background(np: NARCPath, members: UnpackingMembers):
+        try:
+            await util.unpack_narc_async(
+                narc, np, rom_contents / "filesys", force, False, members.written
+            )
+        finally:
+            members.finish()
+
+    async def unpack(np: NARCPath) -> Members:
+        if rom_contents is None:
+            return ArchiveMembers(
+                await traced(f"unpack {np.name}", asyncio.to_thread(open_narc, np))
+            )
+
+        filesys = rom_contents / "filesys"
+        members = UnpackingMembers(filesys / f"{util.full_stem(np.value)}_contents", np.value.stem)
+        unpacking.append(
+            asyncio.create_task(traced(f"unpack {np.name}", unpack_in_background(np, members)))
+        )
+        return members
+
+    unpacked: dict[NARCPath, asyncio.Task[Members]] = {}
+    opened: dict[NARCPath, asyncio.Task[NARCArchive]] = {}
+    for asset in assets:
+        for np in EXTRACTORS[asset].unpacks:
+            if np not in unpacked:
+                unpacked[np] = asyncio.create_task(unpack(np))
+        for np in EXTRACTORS[asset].opens:
+            if np not in opened:
+                opened[np] = asyncio.create_task(
+                    traced(f"open {np.name}", asyncio.to_thread(open_narc, np))
+                )
+
+    def compare(extractor: extractors.Extractor) -> manifest.Changes | None:
+        if baseline is None:
+            return None
+
+        return baseline.compare(*manifest.inputs(extractor, rom_files))
+
+    async def run(asset: AssetExtractor, after: list[asyncio.Task]):
+        extractor = EXTRACTORS[asset]
+        comparing = asyncio.create_task(
+            traced(f"compare {asset}", asyncio.to_thread(compare, extractor))
+        )
+        await asyncio.gather(*after)
+        changes = await comparing
+        members = {np: await unpacked[np] for np in extractor.unpacks}
+        archives = {np: await opened[np] for np in extractor.opens}
+        with tracing.span(f"extract {asset}", "stage"):
+            await asyncio.to_thread(
+                extractor.extract,
+                gfx,
+                members,
+                archives,
+                {path: rom_files[path] for path in extractor.rom_files},
+                project_root,
+                force,
+                jobs,
+                conversions_file,
+                changes,
+            )
+
+    # Dependencies always point at extractors declared earlier, so creating tasks in declaration
+    # order means each one's prerequisites already exist.
+    stages: dict[AssetExtractor, asyncio.Task] = {}
+    for asset, before in extractors.dependencies(assets).items():
+        stages[asset] = asyncio.create_task(run(asset, [stages[b] for b in before]))
+
+    await asyncio.gather(*unpacked.values(), *opened.values())
+
+    async def announce_unpacked():
+        await asyncio.gather(*unpacking)
+        if unpacked_all is not None:
+            unpacked_all()
+
+    await asyncio.gather(announce_unpacked(), *stages.values())
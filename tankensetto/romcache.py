@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import typing
+import zlib
+
+from tankensetto import outputs, tracing
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Bytes at the start of the ROM checked, along with its size and mtime, before trusting a
+# previously computed hash; they hold the game code and the header's own CRC.
+HEADER_SIZE = 0x200
+
+DEFAULT_LIMIT = 2 * 1024 * 1024 * 1024
+
+# Marker within an entry whose mtime records when the entry was last used.
+LAST_USED = ".last_used"
+
+# Record within an entry of the paths in it which have been completely filled in.
+COMPLETE = ".complete"
+
+
+def default_root() -> pathlib.Path:
+    """
+    The cache directory under `$XDG_CACHE_HOME`, or `~/.cache` if that is not set.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache"
+    return pathlib.Path(base) / "tankensetto"
+
+
+class Lock:
+    """
+    Advisory lock on a file, held shared or exclusive until closed.
+
+    Where flock is not available, locking always succeeds and guards nothing.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a+b")
+
+    def acquire(self, exclusive: bool, blocking: bool = True) -> bool:
+        """
+        Take the lock, or change how it is held.
+
+        Arguments:
+        exclusive -- whether to take the lock exclusively, rather than shared with other readers
+        blocking -- whether to wait for the lock if another process holds it
+
+        Returns False if the lock is held elsewhere and `blocking` is False.
+        """
+        if fcntl is None:
+            return True
+
+        op = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        if not blocking:
+            op |= fcntl.LOCK_NB
+
+        try:
+            fcntl.flock(self._file.fileno(), op)
+        except BlockingIOError:
+            return False
+
+        return True
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class CachedROM:
+    """
+    Directory in the cache holding one ROM's extracted files and unpacked archives, laid out as
+    `NDS.extract` would lay them out.
+
+    The entry is shared when opened. A run which has to fill it in holds it exclusively while
+    doing so, so that no other run reads it half-written, and shares it again once filled.
+
+    A path counts as held only once it has been recorded as complete. Whatever a run leaves behind
+    when it is killed while filling the entry is never recorded, so the next run fills it in anew.
+    """
+
+    def __init__(self, path: pathlib.Path, lock: Lock) -> None:
+        self.path = path
+        self._lock = lock
+
+    def holds(self, paths: typing.Iterable[pathlib.PurePath]) -> bool:
+        """
+        Check whether every one of the given paths, relative to the entry, is completely filled in.
+        """
+        return {str(path) for path in paths} <= self._completed()
+
+    def fill(self, paths: typing.Iterable[pathlib.PurePath], force: bool = False) -> bool:
+        """
+        Hold this entry exclusively, waiting for any other run using it, so that the given paths can
+        be filled in.
+
+        Another run may have filled them in while this one waited; unless forced, the entry is then
+        shared again as it is. Otherwise, until `complete` is called, the paths still to be filled
+        no longer count as held, and anything left at them by a fill which never completed is
+        removed.
+
+        Arguments:
+        paths -- paths to be filled in, relative to the entry
+        force -- if True, every one of the paths is to be filled in again, even if complete
+
+        Returns whether any of the paths remain to be filled in.
+        """
+        paths = list(paths)
+        self._lock.acquire(exclusive=True)
+
+        completed = self._completed()
+        if not force and {str(path) for path in paths} <= completed:
+            self.share()
+            return False
+
+        for path in paths:
+            if str(path) in completed:
+                # Complete paths are left in place; when forced, they are rewritten over it.
+                if force:
+                    completed.remove(str(path))
+            elif (self.path / path).is_dir():
+                shutil.rmtree(self.path / path)
+            else:
+                (self.path / path).unlink(missing_ok=True)
+
+        self._record(completed)
+        return True
+
+    def complete(self, paths: typing.Iterable[pathlib.PurePath]) -> None:
+        """
+        Record the given paths as completely filled in.
+        """
+        self._record(self._completed() | {str(path) for path in paths})
+
+    def share(self) -> None:
+        """
+        Let other runs use this entry at the same time; it will not be evicted until released.
+        """
+        self._lock.acquire(exclusive=False)
+
+    def conversions_file(self, project_root: pathlib.Path) -> pathlib.Path:
+        """
+        Where to record conversions into the given project, which is kept apart from those of
+        every other project extracted from this ROM.
+        """
+        project = hashlib.sha1(str(project_root.resolve()).encode("utf-8")).hexdigest()
+        return self.path / "conversions" / f"{project}.json"
+
+    def _completed(self) -> set[str]:
+        return _completed(self.path)
+
+    def _record(self, completed: set[str]) -> None:
+        outputs.write_text(self.path / COMPLETE, json.dumps(sorted(completed), indent=4))
+
+
+class ROMCache:
+    """
+    Extracted ROM files and unpacked archives, shared by every project and working directory.
+
+    Each ROM has its own entry, named for the SHA-1 of the ROM's contents, so that ROMs which share
+    a file name never collide and a ROM seen before is never extracted again. Once the entries
+    grow past the size limit, those used least recently are evicted.
+
+    Runs hold a shared lock on their ROM's entry while they use it; filling an entry in and
+    evicting it each take the lock exclusively.
+    """
+
+    def __init__(self, root: pathlib.Path | None = None, limit: int = DEFAULT_LIMIT) -> None:
+        """
+        Constructor.
+
+        Arguments:
+        root -- cache directory; by default, `default_root()`
+        limit -- total size in bytes beyond which entries are evicted
+        """
+        self.root = root or default_root()
+        self.limit = limit
+        self.roms = self.root / "roms"
+        self.locks = self.root / "locks"
+        self.index = self.root / "roms.json"
+
+    def identify(self, path_to_rom: pathlib.Path) -> str:
+        """
+        Compute the SHA-1 of a ROM, reusing the last result for the same file if its size, mtime,
+        and header are unchanged since.
+
+        Arguments:
+        path_to_rom -- path to the ROM file
+        """
+        stat = path_to_rom.stat()
+        with open(path_to_rom, "rb") as rom:
+            fingerprint = [stat.st_size, stat.st_mtime_ns, zlib.crc32(rom.read(HEADER_SIZE))]
+
+        try:
+            known = json.loads(self.index.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            known = {}
+
+        key = str(path_to_rom.resolve())
+        seen = known.get(key)
+        if seen and seen["fingerprint"] == fingerprint:
+            return seen["sha1"]
+
+        with tracing.span("hash ROM", "stage"), open(path_to_rom, "rb") as rom:
+            sha1 = hashlib.file_digest(rom, "sha1").hexdigest()
+
+        known[key] = {"fingerprint": fingerprint, "sha1": sha1}
+        self.root.mkdir(parents=True, exist_ok=True)
+        outputs.write_text(self.index, json.dumps(known, indent=4))
+        return sha1
+
+    @contextlib.contextmanager
+    def open(self, path_to_rom: pathlib.Path) -> typing.Iterator[CachedROM]:
+        """
+        Hold the entry for a ROM, shared with other runs, creating it if needed.
+
+        Once released, entries are evicted as needed to bring the cache back under its limit.
+
+        Arguments:
+        path_to_rom -- path to the ROM file
+        """
+        sha1 = self.identify(path_to_rom)
+        lock = Lock(self.locks / sha1)
+        try:
+            lock.acquire(exclusive=False)
+            entry = CachedROM(self.roms / sha1, lock)
+            entry.path.mkdir(parents=True, exist_ok=True)
+            (entry.path / LAST_USED).touch()
+            yield entry
+        finally:
+            lock.close()
+
+        self.evict(keep=sha1)
+
+    def evict(self, keep: str | None = None) -> list[str]:
+        """
+        Remove the least recently used entries until the cache fits within its limit.
+
+        Entries with nothing completely filled in go first, whatever the total size, since they
+        were left behind by runs which never finished filling them. Entries in use by another run
+        are left alone.
+
+        Arguments:
+        keep -- SHA-1 of an entry never to evict, e.g. the one just used
+
+        Returns the SHA-1 of each entry removed.
+        """
+        if not self.roms.is_dir():
+            return []
+
+        entries = {
+            path: (bool(_completed(path)), _last_used(path), _size(path))
+            for path in self.roms.iterdir()
+        }
+        total = sum(size for (_, _, size) in entries.values())
+
+        evicted = []
+        for path, (complete, _, size) in sorted(entries.items(), key=lambda item: item[1][:2]):
+            if complete and total <= self.limit:
+                break
+            if path.name == keep:
+                continue
+
+            lock = Lock(self.locks / path.name)
+            try:
+                if not lock.acquire(exclusive=True, blocking=False):
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+            finally:
+                lock.close()
+
+            total -= size
+            evicted.append(path.name)
+
+        return evicted
+
+
+def _completed(entry: pathlib.Path) -> set[str]:
+    try:
+        return set(json.loads((entry / COMPLETE).read_text(encoding="utf-8")))
+    except (OSError, ValueError):
+        return set()
+
+
+def _last_used(entry: pathlib.Path) -> int:
+    try:
+        return (entry / LAST_USED).stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def _size(entry: pathlib.Path) -> int:
+    total = 0
+    for parent, _, files in os.walk(entry):
+        for name in files:
+            with contextlib.suppress(FileNotFoundError):
+                total += os.stat(os.path.join(parent, name)).st_size
+
+    return total
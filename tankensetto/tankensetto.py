@@ -21,29 +21,62 @@ import pathlib
 
 import click
 
-from tankensetto import extractors, info
-from tankensetto.extractors import EXTRACTORS
-from tankensetto.tools.gfx import NitroGFX
-from tankensetto.tools.narc import Knarc
-from tankensetto.tools.nds import NDSTOOL
+from tankensetto import extractors, tracing
 
+ASSETS_EPILOG = f"Possible values for ASSETS: {list(map(str, extractors.AssetExtractor))}"
 
-@click.command(epilog=f"Possible values for ASSETS: {list(map(str, extractors.AssetExtractor))}")
-@click.help_option("-h", "--help")
-@click.option(
+source_rom_option = click.option(
     "-s",
     "--source-rom",
     prompt="Path to source ROM",
     type=pathlib.Path,
     help="Source ROM to be asset-mined.",
 )
-@click.option(
+target_repo_option = click.option(
     "-t",
     "--target-repo",
     prompt="Path to your project",
     type=pathlib.Path,
     help="Target decomp project for dumping.",
 )
+assets_argument = click.argument(
+    "assets",
+    nargs=-1,
+    type=extractors.AssetExtractor,
+)
+
+
+class DefaultGroup(click.Group):
+    """
+    Group of commands which runs `extract` when no other command is named, so that invocations
+    from before there were subcommands keep working.
+    """
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        if not args or (args[0] not in self.commands and args[0] not in ("-h", "--help")):
+            args = ["extract", *args]
+
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultGroup)
+@click.help_option("-h", "--help")
+def main():
+    """
+    A collection of data-mining utilities for DS Pokémon games.
+
+    This tool is aimed at prospective users of the pret decompilation projects
+    who have an existing binary hacking project. It will guide such a user
+    through extracting modified assets into the decomp project structure.
+
+    If no COMMAND is given, `extract` is run.
+    """
+
+
+@main.command(epilog=ASSETS_EPILOG)
+@click.help_option("-h", "--help")
+@source_rom_option
+@target_repo_option
 @click.option(
     "-f",
     "--force",
@@ -51,34 +84,296 @@ from tankensetto.tools.nds import NDSTOOL
     default=False,
     help="If specified, requested archives will be re-extracted.",
 )
-@click.argument(
-    "assets",
-    nargs=-1,
-    type=extractors.AssetExtractor,
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of worker processes to use for conversion.",
+)
+@click.option(
+    "--no-intermediates",
+    is_flag=True,
+    default=False,
+    help=(
+        "If specified, keep ROM and archive contents in memory rather than unpacking them to "
+        "disk."
+    ),
 )
-def main(
+@click.option(
+    "--changed-only",
+    is_flag=True,
+    default=False,
+    help="If specified, only convert assets which differ from the unmodified game.",
+)
+@click.option(
+    "--manifest",
+    "manifest_path",
+    type=pathlib.Path,
+    default=None,
+    help="Manifest of the unmodified game for --changed-only, if not the default one.",
+)
+@click.option(
+    "--cache-limit",
+    type=click.IntRange(min=0),
+    default=2048,
+    help="Size in MiB beyond which the least recently used ROMs are evicted from the cache.",
+)
+@click.option(
+    "--profile",
+    type=pathlib.Path,
+    default=None,
+    help="If specified, write a Chrome trace of the run to this path and print a summary.",
+)
+@assets_argument
+def extract(
     source_rom: pathlib.Path,
     target_repo: pathlib.Path,
     force: bool,
+    jobs: int,
+    no_intermediates: bool,
+    changed_only: bool,
+    manifest_path: pathlib.Path | None,
+    cache_limit: int,
+    profile: pathlib.Path | None,
     assets: tuple[extractors.AssetExtractor],
 ):
     """
-    A collection of data-mining utilities for DS Pokémon games.
+    Extract assets from the source ROM into the project.
 
-    This tool is aimed at prospective users of the pret decompilation projects
-    who have an existing binary hacking project. It will guide such a user
-    through extracting modified assets into the decomp project structure.
+    Files read from the ROM and the contents of its archives are kept in a
+    cache under $XDG_CACHE_HOME/tankensetto, shared by every project.
 
     If any ASSETS are specified, then only the requested ASSETS will be
     extracted.
     """
-    rom_contents = pathlib.Path(source_rom.name + "_contents")
-    extract_result = NDSTOOL.extract(source_rom, rom_contents, force)
-    info.echo_result(extract_result, source_rom.name, rom_contents.name)
+    # Everything needed to actually run is imported here, so that `--help` and argument errors
+    # are not held up by it.
+    import asyncio
+    import contextlib
+
+    import rich
+
+    from tankensetto import info, manifest, pipeline, romcache, tools, util
+    from tankensetto.tools.gfx import NativeGFX, Source
+    from tankensetto.tools.narc import NativeNARC
+    from tankensetto.tools.nds import NATIVE_NDS
+
+    baseline = None
+    if changed_only:
+        baseline = (
+            manifest.Manifest.load(manifest_path) if manifest_path else manifest.Manifest.default()
+        )
+        if baseline is None:
+            raise click.UsageError(
+                "No manifest of the unmodified game was found; generate one with "
+                "`python -m tankensetto.manifest <rom>`, or pass one with --manifest."
+            )
+
+        with NATIVE_NDS.open(source_rom) as rom:
+            if rom.game_code != baseline.game_code:
+                rich.print(
+                    f"[bold yellow]![/] {source_rom.name} is {rom.game_code}, but the manifest is "
+                    f"of {baseline.game_code}; most assets will count as changed"
+                )
+
+    tracer = tracing.enable() if profile else None
+    try:
+        with contextlib.ExitStack() as stack:
+            to_extract = assets if assets else tuple(extractors.AssetExtractor)
+            needed = extractors.rom_files(to_extract)
+
+            narc = NativeNARC()
+            gfx = NativeGFX()
+
+            rom_contents = None
+            conversions_file = None
+            unpacked_all = None
+            rom_files: dict[pathlib.PurePath, Source] = {}
+            if no_intermediates:
+                with tracing.span("read ROM", "stage"):
+                    rom_files.update(NATIVE_NDS.read_files(source_rom, needed))
+                rich.print(f"[bold green]✓[/] Read [bold yellow]{source_rom.name}[/]")
+            else:
+                rom_cache = romcache.ROMCache(limit=cache_limit * 1024 * 1024)
+                cached = stack.enter_context(rom_cache.open(source_rom))
+                rom_contents = cached.path
+                conversions_file = cached.conversions_file(target_repo)
+
+                # The entry is filled in while held exclusively, then shared once its NARCs are
+                # unpacked, which happens alongside the first conversions. Another run may fill it
+                # in while this one waits to, so `fill` checks again once it holds the entry.
+                unpack_dirs = [
+                    pathlib.PurePath("filesys") / f"{util.full_stem(np.value)}_contents"
+                    for np in extractors.unpacks(to_extract)
+                ]
+                extract_result = tools.Result.UNPACK_EXISTS
+                filling = force or not cached.holds([*needed, *unpack_dirs])
+                if filling and cached.fill([*needed, *unpack_dirs], force):
+                    with tracing.span("extract ROM", "stage"):
+                        extract_result = NATIVE_NDS.extract_files(
+                            source_rom, rom_contents, needed, force
+                        )
+                    cached.complete(needed)
+
+                    # The NARCs are unpacked in the background, so they count as filled in only
+                    # once every one of them has finished.
+                    def unpacked_all():
+                        cached.complete(unpack_dirs)
+                        cached.share()
+
+                info.echo_result(extract_result, source_rom.name, rom_contents)
+                rom_files.update({path: rom_contents / path for path in needed})
+
+            asyncio.run(
+                pipeline.run_extractors(
+                    to_extract,
+                    narc,
+                    gfx,
+                    rom_files,
+                    rom_contents,
+                    target_repo,
+                    force,
+                    jobs,
+                    baseline,
+                    conversions_file,
+                    unpacked_all,
+                )
+            )
+    finally:
+        if tracer and profile:
+            tracer.write(profile)
+            rich.print(tracer.summary())
+            rich.print(f"[bold green]✓[/] Wrote trace to [bold yellow]{profile}[/]")
+
+
+@main.command(epilog=ASSETS_EPILOG)
+@click.help_option("-h", "--help")
+@source_rom_option
+@target_repo_option
+@click.option(
+    "--exit-code",
+    is_flag=True,
+    default=False,
+    help="If specified, exit with status 1 if extracting would add or change any file.",
+)
+@assets_argument
+def status(
+    source_rom: pathlib.Path,
+    target_repo: pathlib.Path,
+    exit_code: bool,
+    assets: tuple[extractors.AssetExtractor],
+):
+    """
+    Report which files extraction would add to or change in the project.
+
+    Nothing is written: the ROM's archives are read in place and decoded in
+    memory, then compared against the project's current files.
+
+    If any ASSETS are specified, then only the requested ASSETS will be
+    checked.
+    """
+    import rich
+
+    from tankensetto import diff
+    from tankensetto.tools.narc import ArchiveMembers, NARCArchive
+    from tankensetto.tools.nds import NATIVE_NDS
+
+    to_check = assets if assets else tuple(extractors.AssetExtractor)
+    rom_files = NATIVE_NDS.read_files(source_rom, extractors.rom_files(to_check))
+
+    def open_narc(np):
+        return NARCArchive(rom_files[pathlib.PurePath("filesys") / np.value])
+
+    results = []
+    for asset in to_check:
+        extractor = extractors.EXTRACTORS[asset]
+        if extractor.status is None:
+            rich.print(f"[bold yellow]![/] {asset} cannot report its status; skipping...")
+            continue
+
+        results.extend(
+            extractor.status(
+                {np: ArchiveMembers(open_narc(np)) for np in extractor.unpacks},
+                {np: open_narc(np) for np in extractor.opens},
+                {path: rom_files[path] for path in extractor.rom_files},
+                target_repo,
+            )
+        )
+
+    counts = diff.report(results, target_repo)
+    if exit_code and (counts[diff.State.ADDED] or counts[diff.State.CHANGED]):
+        raise SystemExit(1)
+
+
+@main.command("ls")
+@click.help_option("-h", "--help")
+@source_rom_option
+@click.argument("prefix", default="")
+def ls(source_rom: pathlib.Path, prefix: str):
+    """
+    List the ROM's files whose paths start with PREFIX, or the members of the
+    NARC at PREFIX.
+
+    Paths are as laid out by extraction, e.g. `arm9.bin` or
+    `filesys/poketool/pokegra/pl_pokegra.narc`. Each line gives the offset
+    within the ROM, the size, the format, and the path.
+
+    The ROM is indexed on first use; later listings are read from the index.
+    """
+    from tankensetto import index
+
+    with index.Index() as idx:
+        for entry in idx.ls(idx.ensure(source_rom), prefix):
+            click.echo(entry.line())
+
+
+@main.command()
+@click.help_option("-h", "--help")
+@source_rom_option
+@click.option(
+    "--format",
+    "format_name",
+    default=None,
+    help="If specified, only find files of this format, e.g. NCGR, LZ, or raw.",
+)
+@click.option(
+    "--path",
+    "pattern",
+    default=None,
+    help="If specified, only find files whose paths match this glob.",
+)
+@click.option(
+    "--changed-from",
+    type=pathlib.Path,
+    default=None,
+    help="If specified, only find files which differ from those of this ROM.",
+)
+def find(
+    source_rom: pathlib.Path,
+    format_name: str | None,
+    pattern: str | None,
+    changed_from: pathlib.Path | None,
+):
+    """
+    Find the ROM's files and NARC members by format, path, and whether they
+    changed from another ROM.
+
+    Each line gives the offset within the ROM, the size, the format, and the
+    path, followed by the member index for members of NARCs.
+    """
+    from tankensetto import index
 
-    knarc = Knarc(target_repo)
-    gfx = NitroGFX(target_repo)
+    if format_name is not None:
+        formats = {name.lower(): name for name in index.FORMATS}
+        if format_name.lower() not in formats:
+            raise click.BadParameter(
+                f"must be one of {', '.join(index.FORMATS)}", param_hint="--format"
+            )
+        format_name = formats[format_name.lower()]
 
-    to_extract = assets if assets else tuple(extractors.AssetExtractor)
-    for asset in to_extract:
-        EXTRACTORS[asset](knarc, gfx, rom_contents / "filesys", target_repo, force)
+    with index.Index() as idx:
+        rom = idx.ensure(source_rom)
+        base = idx.ensure(changed_from) if changed_from else None
+        for entry in idx.find(rom, format_name, pattern, base):
+            click.echo(entry.line())
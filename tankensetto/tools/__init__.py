@@ -17,9 +17,39 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import asyncio
+import dataclasses
 import enum
+import os
 import pathlib
+import shutil
 import subprocess
+import typing
+
+from tankensetto import tracing
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ioctl request number for FICLONE, from <linux/fs.h>.
+FICLONE = 0x40049409
+
+
+@dataclasses.dataclass
+class Invocation:
+    """
+    Record of a single completed run of an external tool.
+    """
+
+    args: list[str | pathlib.Path]
+    returncode: int
+    stderr: bytes
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
 
 
 class Tool:
@@ -27,15 +57,25 @@ class Tool:
     Abstraction of an external executable tool for the data-mining process.
     """
 
-    def __init__(self, exe: pathlib.Path, parent: pathlib.Path = pathlib.Path.cwd()) -> None:
+    def __init__(
+        self,
+        exe: pathlib.Path,
+        parent: pathlib.Path = pathlib.Path.cwd(),
+        max_concurrency: int = os.cpu_count() or 1,
+    ) -> None:
         """
         Constructor.
 
         Arguments:
         exe -- path component to the executable
-        in_proj -- if True, then the given path is relative to the target project
+        parent -- directory to which the executable's path is relative
+        max_concurrency -- maximum number of asynchronous runs in flight at once
         """
         self.exe = parent / exe
+        self.max_concurrency = max_concurrency
+        self.failures: list[Invocation] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._semaphore: asyncio.Semaphore | None = None
 
     def run(self, args: list[str | pathlib.Path]) -> None:
         """
@@ -44,11 +84,151 @@ class Tool:
         Arguments:
         args -- additional args to the process
         """
-        with subprocess.Popen([self.exe, *args], stdout=subprocess.DEVNULL) as proc:
-            proc.wait()
-            assert proc.returncode == 0
+        argv = [self.exe, *args]
+        with tracing.span(self.exe.name, "tool", argv=list(map(str, argv))) as span:
+            with subprocess.Popen(argv, stdout=subprocess.DEVNULL) as proc:
+                proc.wait()
+                span["returncode"] = proc.returncode
+                assert proc.returncode == 0
+
+    async def run_async(self, args: list[str | pathlib.Path]) -> Invocation:
+        """
+        Run the executable without blocking the event loop.
+
+        At most `max_concurrency` runs of this tool are in flight at once; further calls wait for
+        a free slot. A failing run does not raise; it is returned and recorded in `failures`.
+
+        Arguments:
+        args -- additional args to the process
+        """
+        async with self._limit():
+            with tracing.span(self.exe.name, "tool", argv=[str(self.exe), *map(str, args)]) as span:
+                proc = await asyncio.create_subprocess_exec(
+                    self.exe,
+                    *args,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                (_, stderr) = await proc.communicate()
+                span["returncode"] = proc.returncode
+
+        invocation = Invocation([self.exe, *args], proc.returncode or 0, stderr)
+        if not invocation.ok:
+            self.failures.append(invocation)
+
+        return invocation
+
+    async def run_many(self, argss: list[list[str | pathlib.Path]]) -> list[Invocation]:
+        """
+        Run the executable once per set of args and wait for all runs together.
+
+        Arguments:
+        argss -- additional args for each process
+        """
+        return list(await asyncio.gather(*(self.run_async(args) for args in argss)))
+
+    def _limit(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        return self._semaphore
 
 
 class Result(enum.IntEnum):
     SUCCESS = enum.auto()
     UNPACK_EXISTS = enum.auto()
+    FAILURE = enum.auto()
+
+    @classmethod
+    def of(cls, invocation: Invocation) -> "Result":
+        return cls.SUCCESS if invocation.ok else cls.FAILURE
+
+
+def link_or_copy(src: pathlib.Path, dst: pathlib.Path, hard: bool = True) -> None:
+    """
+    Make a file available under a second name without duplicating its bytes where possible.
+
+    Tries, in order, a hard link, a copy-on-write reflink, and a plain copy. Any existing file at
+    the destination is replaced.
+
+    Arguments:
+    src -- the existing file
+    dst -- the name under which it should also be available
+    hard -- whether a hard link is acceptable; pass False if `dst` may be edited independently
+    """
+    dst.unlink(missing_ok=True)
+
+    if hard:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+
+    if fcntl is not None:
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            return
+        except OSError:
+            pass
+
+    shutil.copyfile(src, dst)
+
+
+def copy_range(src: typing.BinaryIO, dst: pathlib.Path, offset: int, size: int) -> None:
+    """
+    Copy a range of an open file to a new file, keeping the data in the kernel where possible.
+
+    Tries, in order, copy_file_range (which may share extents on filesystems with reflinks),
+    sendfile, and a plain read and write.
+
+    Arguments:
+    src -- the open source file
+    dst -- path to the file to create
+    offset -- start of the range in the source file
+    size -- length of the range
+    """
+    with open(dst, "wb") as out:
+        copied = 0
+        for method in (_copy_file_range, _sendfile):
+            try:
+                while copied < size:
+                    n = method(src.fileno(), out.fileno(), offset + copied, size - copied)
+                    if n == 0:
+                        raise EOFError(f"unexpected end of file copying {dst}")
+                    copied += n
+                return
+            except (AttributeError, OSError):
+                # Unsupported here; the next method picks up from wherever this one stopped.
+                continue
+
+        src.seek(offset + copied)
+        out.seek(copied)
+        out.write(src.read(size - copied))
+
+
+def _copy_file_range(src: int, dst: int, offset: int, count: int) -> int:
+    return os.copy_file_range(src, dst, count, offset)
+
+
+def _sendfile(src: int, dst: int, offset: int, count: int) -> int:
+    return os.sendfile(dst, src, offset, count)
+
+
+SHM = pathlib.Path("/dev/shm")
+
+
+def spool_dir() -> pathlib.Path | None:
+    """
+    Pick a directory for scratch files which only exist to hand data to an external tool.
+
+    Memory-backed tmpfs is preferred where available, so that such files never reach the disk.
+    Returns None to use the platform's default temporary directory.
+    """
+    if SHM.is_dir() and os.access(SHM, os.W_OK):
+        return SHM
+
+    return None
@@ -18,22 +18,131 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import abc
+import asyncio
+import concurrent.futures
+import dataclasses
+import functools
+import hashlib
+import itertools
 import pathlib
+import tempfile
+import typing
 
-from tankensetto import tools
+from tankensetto import outputs, tools, tracing
+from tankensetto.formats import nanr, ncer, ncgr, nclr, png
+
+
+# Input to a conversion: either a path to a file, whatever its extension, or its contents.
+Source = pathlib.Path | bytes
+
+# Jobs handed to a worker process at once when the number of jobs is not known up front.
+CHUNK_SIZE = 16
+
+
+def read(source: Source) -> bytes:
+    """
+    Get the contents of a conversion input.
+    """
+    return source if isinstance(source, bytes) else source.read_bytes()
+
+
+def read_range(source: Source, offset: int, size: int) -> bytes:
+    """
+    Get part of a conversion input, reading only that part from disk.
+    """
+    if isinstance(source, bytes):
+        return source[offset : offset + size]
+
+    with open(source, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+def size(source: Source) -> int:
+    """
+    Get the size of a conversion input, without reading it from disk.
+    """
+    return len(source) if isinstance(source, bytes) else source.stat().st_size
+
+
+def save(source: Source, dest: pathlib.Path) -> None:
+    """
+    Store a conversion input as-is at the given path, e.g. to keep an original alongside the
+    converted files. An existing file at the destination is only replaced if it differs.
+    """
+    outputs.write_bytes(dest, read(source))
+
+
+@dataclasses.dataclass(frozen=True)
+class NCGRToPNG:
+    """
+    Job to convert an NCGR to a PNG, using the given NCLR as its palette.
+    """
+
+    source: Source
+    palette: Source
+    output: pathlib.Path
+    pal_idx: int = 0
+    extra_args: tuple[str, ...] = ()
+
+
+@dataclasses.dataclass(frozen=True)
+class NCLRToPAL:
+    """
+    Job to convert an NCLR to a JASC PAL.
+    """
+
+    source: Source
+    output: pathlib.Path
+    bitdepth: int = 0
+    extra_args: tuple[str, ...] = ()
+
+
+@dataclasses.dataclass(frozen=True)
+class NCERToJSON:
+    """
+    Job to convert an NCER to JSON.
+    """
+
+    source: Source
+    output: pathlib.Path
+
+
+@dataclasses.dataclass(frozen=True)
+class NANRToJSON:
+    """
+    Job to convert an NANR to JSON.
+    """
+
+    source: Source
+    output: pathlib.Path
+
+
+Job = NCGRToPNG | NCLRToPAL | NCERToJSON | NANRToJSON
 
 
 class GFX(abc.ABC):
     """
     Abstract contract for a tool which can convert Nitro graphics files to common media formats.
+
+    The format of each input is given by the conversion itself, so inputs may be unpacked archive
+    members under any name, or their contents in memory.
     """
 
+    @property
+    def version(self) -> str:
+        """
+        Identifier for the output this implementation produces; cached conversions made under a
+        different version are redone.
+        """
+        return type(self).__name__
+
     @abc.abstractmethod
     def ncgr_to_png(
         self,
-        path_to_ncgr: pathlib.Path,
+        path_to_ncgr: Source,
         path_to_png: pathlib.Path,
-        path_to_nclr: pathlib.Path,
+        path_to_nclr: Source,
         pal_idx: int = 0,
         extra_args: list = [],
     ) -> tools.Result:
@@ -41,9 +150,9 @@ class GFX(abc.ABC):
         Convert an NCGR to a PNG, using the given NCLR as its palette.
 
         Arguments:
-        path_to_ncgr -- path to the NCGR file
+        path_to_ncgr -- path to, or contents of, the NCGR file
         path_to_png -- path to the output PNG file
-        path_to_nclr -- path to NCLR palette to apply to the output PNG
+        path_to_nclr -- path to, or contents of, the NCLR palette to apply to the output PNG
         pal_idx -- index in the palette file to be used
         extra_args -- list of additional args
         """
@@ -52,7 +161,7 @@ class GFX(abc.ABC):
     @abc.abstractmethod
     def nclr_to_pal(
         self,
-        path_to_nclr: pathlib.Path,
+        path_to_nclr: Source,
         path_to_pal: pathlib.Path,
         bitdepth: int = 0,
         extra_args: list = [],
@@ -61,7 +170,7 @@ class GFX(abc.ABC):
         Convert an NCLR to a JASC PAL.
 
         Arguments:
-        path_to_nclr -- path to the NCLR file
+        path_to_nclr -- path to, or contents of, the NCLR file
         path_to_pal -- path to the output PAL file
         bitdepth -- bitdepth for the palette
         extra_args -- list of additional args
@@ -70,7 +179,7 @@ class GFX(abc.ABC):
     @abc.abstractmethod
     def ncer_to_json(
         self,
-        path_to_ncer: pathlib.Path,
+        path_to_ncer: Source,
         path_to_json: pathlib.Path,
     ) -> tools.Result:
         """
@@ -80,13 +189,135 @@ class GFX(abc.ABC):
     @abc.abstractmethod
     def nanr_to_json(
         self,
-        path_to_nanr: pathlib.Path,
+        path_to_nanr: Source,
         path_to_json: pathlib.Path,
     ) -> tools.Result:
         """
         Convert an NANR to JSON.
         """
 
+    async def ncgr_to_png_async(
+        self,
+        path_to_ncgr: Source,
+        path_to_png: pathlib.Path,
+        path_to_nclr: Source,
+        pal_idx: int = 0,
+        extra_args: list = [],
+    ) -> tools.Result:
+        """
+        Awaitable form of `ncgr_to_png`; by default, runs the conversion on a worker thread.
+        """
+        return await asyncio.to_thread(
+            self.ncgr_to_png, path_to_ncgr, path_to_png, path_to_nclr, pal_idx, extra_args
+        )
+
+    async def nclr_to_pal_async(
+        self,
+        path_to_nclr: Source,
+        path_to_pal: pathlib.Path,
+        bitdepth: int = 0,
+        extra_args: list = [],
+    ) -> tools.Result:
+        """
+        Awaitable form of `nclr_to_pal`; by default, runs the conversion on a worker thread.
+        """
+        return await asyncio.to_thread(
+            self.nclr_to_pal, path_to_nclr, path_to_pal, bitdepth, extra_args
+        )
+
+    async def ncer_to_json_async(
+        self,
+        path_to_ncer: Source,
+        path_to_json: pathlib.Path,
+    ) -> tools.Result:
+        """
+        Awaitable form of `ncer_to_json`; by default, runs the conversion on a worker thread.
+        """
+        return await asyncio.to_thread(self.ncer_to_json, path_to_ncer, path_to_json)
+
+    async def nanr_to_json_async(
+        self,
+        path_to_nanr: Source,
+        path_to_json: pathlib.Path,
+    ) -> tools.Result:
+        """
+        Awaitable form of `nanr_to_json`; by default, runs the conversion on a worker thread.
+        """
+        return await asyncio.to_thread(self.nanr_to_json, path_to_nanr, path_to_json)
+
+    def convert(self, job: Job) -> tools.Result:
+        """
+        Run a single conversion job.
+
+        Arguments:
+        job -- the conversion to run
+        """
+        with tracing.span(type(job).__name__, "convert", output=str(job.output)):
+            return self._convert(job)
+
+    def _convert(self, job: Job) -> tools.Result:
+        match job:
+            case NCGRToPNG():
+                return self.ncgr_to_png(
+                    job.source, job.output, job.palette, job.pal_idx, list(job.extra_args)
+                )
+            case NCLRToPAL():
+                return self.nclr_to_pal(job.source, job.output, job.bitdepth, list(job.extra_args))
+            case NCERToJSON():
+                return self.ncer_to_json(job.source, job.output)
+            case NANRToJSON():
+                return self.nanr_to_json(job.source, job.output)
+
+    async def convert_async(self, job: Job) -> tools.Result:
+        """
+        Awaitable form of `convert`.
+        """
+        with tracing.span(type(job).__name__, "convert", output=str(job.output)):
+            return await self._convert_async(job)
+
+    async def _convert_async(self, job: Job) -> tools.Result:
+        match job:
+            case NCGRToPNG():
+                return await self.ncgr_to_png_async(
+                    job.source, job.output, job.palette, job.pal_idx, list(job.extra_args)
+                )
+            case NCLRToPAL():
+                return await self.nclr_to_pal_async(
+                    job.source, job.output, job.bitdepth, list(job.extra_args)
+                )
+            case NCERToJSON():
+                return await self.ncer_to_json_async(job.source, job.output)
+            case NANRToJSON():
+                return await self.nanr_to_json_async(job.source, job.output)
+
+    def convert_batch(
+        self,
+        jobs: typing.Iterable[Job],
+        workers: int = 1,
+        on_done: typing.Callable[[Job, tools.Result], None] | None = None,
+    ) -> list[tools.Result]:
+        """
+        Run a batch of conversion jobs, leaving the scheduling to the implementation.
+
+        Jobs are taken from `jobs` only as there is room to run them, so it may be a generator
+        which produces each job once its inputs are ready. By default, jobs are run one at a time,
+        in order.
+
+        Arguments:
+        jobs -- the conversions to run
+        workers -- number of conversions which may run at once
+        on_done -- callback invoked with each job and its result as it finishes
+
+        Returns the result of each job, in the order given.
+        """
+        results = []
+        for job in jobs:
+            results.append(self.convert(job))
+            if on_done:
+                on_done(job, results[-1])
+
+        return results
+
 
 class NitroGFX(GFX, tools.Tool):
     """
@@ -95,39 +326,220 @@ class NitroGFX(GFX, tools.Tool):
 
     def __init__(self, parent: pathlib.Path) -> None:
         super().__init__(pathlib.Path("build/subprojects/nitrogfx/nitrogfx"), parent)
+        self._typed: dict[tuple[Source, str], pathlib.Path] = {}
+        self._scratch: tempfile.TemporaryDirectory | None = None
+
+    @functools.cached_property
+    def version(self) -> str:
+        return f"nitrogfx-{hashlib.sha1(self.exe.read_bytes()).hexdigest()}"
 
     def ncgr_to_png(
         self,
-        path_to_ncgr: pathlib.Path,
+        path_to_ncgr: Source,
+        path_to_png: pathlib.Path,
+        path_to_nclr: Source,
+        pal_idx: int = 0,
+        extra_args: list = [],
+    ) -> tools.Result:
+        staged = self._staged(path_to_png)
+        self.run(self._ncgr_to_png_args(path_to_ncgr, staged, path_to_nclr, pal_idx, extra_args))
+        outputs.replace(staged, path_to_png)
+        return tools.Result.SUCCESS
+
+    def nclr_to_pal(
+        self,
+        path_to_nclr: Source,
+        path_to_pal: pathlib.Path,
+        bitdepth: int = 0,
+        extra_args: list = [],
+    ) -> tools.Result:
+        staged = self._staged(path_to_pal)
+        self.run(self._nclr_to_pal_args(path_to_nclr, staged, bitdepth, extra_args))
+        outputs.replace(staged, path_to_pal)
+        return tools.Result.SUCCESS
+
+    def ncer_to_json(
+        self,
+        path_to_ncer: Source,
+        path_to_json: pathlib.Path,
+    ) -> tools.Result:
+        staged = self._staged(path_to_json)
+        self.run([self._typed_path(path_to_ncer, ".NCER"), staged])
+        outputs.replace(staged, path_to_json)
+        return tools.Result.SUCCESS
+
+    def nanr_to_json(
+        self,
+        path_to_nanr: Source,
+        path_to_json: pathlib.Path,
+    ) -> tools.Result:
+        staged = self._staged(path_to_json)
+        self.run([self._typed_path(path_to_nanr, ".NANR"), staged])
+        outputs.replace(staged, path_to_json)
+        return tools.Result.SUCCESS
+
+    async def ncgr_to_png_async(
+        self,
+        path_to_ncgr: Source,
         path_to_png: pathlib.Path,
-        path_to_nclr: pathlib.Path,
+        path_to_nclr: Source,
         pal_idx: int = 0,
         extra_args: list = [],
     ) -> tools.Result:
-        args = [
-            path_to_ncgr,
+        staged = self._staged(path_to_png)
+        args = self._ncgr_to_png_args(path_to_ncgr, staged, path_to_nclr, pal_idx, extra_args)
+        return self._publish(await self.run_async(args), staged, path_to_png)
+
+    async def nclr_to_pal_async(
+        self,
+        path_to_nclr: Source,
+        path_to_pal: pathlib.Path,
+        bitdepth: int = 0,
+        extra_args: list = [],
+    ) -> tools.Result:
+        staged = self._staged(path_to_pal)
+        args = self._nclr_to_pal_args(path_to_nclr, staged, bitdepth, extra_args)
+        return self._publish(await self.run_async(args), staged, path_to_pal)
+
+    async def ncer_to_json_async(
+        self,
+        path_to_ncer: Source,
+        path_to_json: pathlib.Path,
+    ) -> tools.Result:
+        staged = self._staged(path_to_json)
+        args = [self._typed_path(path_to_ncer, ".NCER"), staged]
+        return self._publish(await self.run_async(args), staged, path_to_json)
+
+    async def nanr_to_json_async(
+        self,
+        path_to_nanr: Source,
+        path_to_json: pathlib.Path,
+    ) -> tools.Result:
+        staged = self._staged(path_to_json)
+        args = [self._typed_path(path_to_nanr, ".NANR"), staged]
+        return self._publish(await self.run_async(args), staged, path_to_json)
+
+    def convert_batch(
+        self,
+        jobs: typing.Iterable[Job],
+        workers: int = 1,
+        on_done: typing.Callable[[Job, tools.Result], None] | None = None,
+    ) -> list[tools.Result]:
+        """
+        Run a batch of conversion jobs, keeping up to `workers` nitrogfx processes in flight.
+
+        Every job is run before any failure is raised.
+        """
+        first_failure = len(self.failures)
+
+        async def run_all() -> list[tools.Result]:
+            # The batch runs on its own event loop, so size this tool's limit for it directly.
+            self._loop = asyncio.get_running_loop()
+            self._semaphore = asyncio.Semaphore(workers)
+
+            pending = iter(jobs)
+            taking = asyncio.Lock()
+            results: list[tools.Result] = []
+
+            async def run():
+                while True:
+                    # Taking a job may wait on its inputs, so it is done off the event loop.
+                    async with taking:
+                        job = await asyncio.to_thread(next, pending, None)
+                        if job is None:
+                            return
+
+                        i = len(results)
+                        results.append(tools.Result.SUCCESS)
+
+                    results[i] = await self.convert_async(job)
+                    if on_done:
+                        on_done(job, results[i])
+
+            await asyncio.gather(*(run() for _ in range(workers)))
+            return results
+
+        results = asyncio.run(run_all())
+        if failures := self.failures[first_failure:]:
+            raise RuntimeError(f"{len(failures)} nitrogfx invocations failed; first: {failures[0]}")
+
+        return results
+
+    def _typed_path(self, source: Source, suffix: str) -> pathlib.Path:
+        """
+        Get a path to the given input which carries the extension nitrogfx expects for its format.
+
+        Files are linked to their typed name next to the original; contents in memory are spooled
+        to a scratch directory, on tmpfs where available. Either is done at most once per input.
+        """
+        if isinstance(source, pathlib.Path) and source.suffix == suffix:
+            return source
+
+        if (source, suffix) not in self._typed:
+            if isinstance(source, bytes):
+                typed = self._scratch_dir() / f"{hashlib.sha1(source).hexdigest()}{suffix}"
+                typed.write_bytes(source)
+            else:
+                typed = source.with_suffix(suffix)
+                tools.link_or_copy(source, typed)
+
+            self._typed[(source, suffix)] = typed
+
+        return self._typed[(source, suffix)]
+
+    def _scratch_dir(self) -> pathlib.Path:
+        if self._scratch is None:
+            self._scratch = tempfile.TemporaryDirectory(
+                prefix="tankensetto-", dir=tools.spool_dir()
+            )
+
+        return pathlib.Path(self._scratch.name)
+
+    def _staged(self, output: pathlib.Path) -> pathlib.Path:
+        """
+        Get a scratch path for nitrogfx to write an output to, so that it can be compared against
+        the project's copy before replacing it.
+        """
+        return self._scratch_dir() / f"{hashlib.sha1(bytes(output)).hexdigest()}{output.suffix}"
+
+    def _publish(
+        self, invocation: tools.Invocation, staged: pathlib.Path, output: pathlib.Path
+    ) -> tools.Result:
+        if invocation.ok:
+            outputs.replace(staged, output)
+
+        return tools.Result.of(invocation)
+
+    def _ncgr_to_png_args(
+        self,
+        path_to_ncgr: Source,
+        path_to_png: pathlib.Path,
+        path_to_nclr: Source,
+        pal_idx: int,
+        extra_args: list,
+    ) -> list[str | pathlib.Path]:
+        args: list[str | pathlib.Path] = [
+            self._typed_path(path_to_ncgr, ".NCGR"),
             path_to_png,
             "-palette",
-            path_to_nclr,
+            self._typed_path(path_to_nclr, ".NCLR"),
         ]
 
         if pal_idx != 0:
             args.extend(["-palindex", str(pal_idx)])
 
         args.extend(extra_args)
+        return args
 
-        self.run(args)
-        return tools.Result.SUCCESS
-
-    def nclr_to_pal(
+    def _nclr_to_pal_args(
         self,
-        path_to_nclr: pathlib.Path,
+        path_to_nclr: Source,
         path_to_pal: pathlib.Path,
-        bitdepth: int = 0,
-        extra_args: list = [],
-    ) -> tools.Result:
+        bitdepth: int,
+        extra_args: list,
+    ) -> list[str | pathlib.Path]:
         args: list[str | pathlib.Path] = [
-            path_to_nclr,
+            self._typed_path(path_to_nclr, ".NCLR"),
             path_to_pal,
         ]
 
@@ -135,22 +547,171 @@ class NitroGFX(GFX, tools.Tool):
             args.extend(["-bitdepth", str(bitdepth)])
 
         args.extend(extra_args)
+        return args
+
+
+class NativeGFX(GFX):
+    """
+    Implementation of GFX contract which decodes Nitro graphics in-process.
+
+    Arguments and outputs follow the same conventions as nitrogfx, without spawning any external
+    processes.
+    """
+
+    # Bump whenever a change here alters the bytes of any converted output.
+    REVISION = 1
+
+    @property
+    def version(self) -> str:
+        return f"native-{self.REVISION}"
+
+    def ncgr_to_png(
+        self,
+        path_to_ncgr: Source,
+        path_to_png: pathlib.Path,
+        path_to_nclr: Source,
+        pal_idx: int = 0,
+        extra_args: list = [],
+    ) -> tools.Result:
+        job = NCGRToPNG(path_to_ncgr, path_to_nclr, path_to_png, pal_idx, tuple(extra_args))
+        outputs.write_bytes(path_to_png, self.render(job))
+        return tools.Result.SUCCESS
 
-        self.run(args)
+    def nclr_to_pal(
+        self,
+        path_to_nclr: Source,
+        path_to_pal: pathlib.Path,
+        bitdepth: int = 0,
+        extra_args: list = [],
+    ) -> tools.Result:
+        job = NCLRToPAL(path_to_nclr, path_to_pal, bitdepth, tuple(extra_args))
+        outputs.write_bytes(path_to_pal, self.render(job))
         return tools.Result.SUCCESS
 
     def ncer_to_json(
         self,
-        path_to_ncer: pathlib.Path,
+        path_to_ncer: Source,
         path_to_json: pathlib.Path,
     ) -> tools.Result:
-        self.run([path_to_ncer, path_to_json])
+        outputs.write_bytes(path_to_json, self.render(NCERToJSON(path_to_ncer, path_to_json)))
         return tools.Result.SUCCESS
 
     def nanr_to_json(
         self,
-        path_to_nanr: pathlib.Path,
+        path_to_nanr: Source,
         path_to_json: pathlib.Path,
     ) -> tools.Result:
-        self.run([path_to_nanr, path_to_json])
+        outputs.write_bytes(path_to_json, self.render(NANRToJSON(path_to_nanr, path_to_json)))
         return tools.Result.SUCCESS
+
+    def image(self, job: NCGRToPNG) -> tuple[int, int, int, list[nclr.Color], bytes]:
+        """
+        Decode the image a PNG conversion would write, without encoding it.
+
+        Returns the width, height, bitdepth, palette, and packed pixel rows, as taken by
+        `png.encode_indexed`.
+
+        Arguments:
+        job -- the conversion to decode
+        """
+        tiles_width = 0
+        if "-width" in job.extra_args:
+            tiles_width = int(job.extra_args[job.extra_args.index("-width") + 1])
+
+        image = ncgr.NCGR.parse(read(job.source))
+        (width, height, rows) = ncgr.to_rows(
+            image,
+            tiles_width,
+            scan_front_to_back="-scanfronttoback" in job.extra_args,
+            handle_empty="-handleempty" in job.extra_args,
+        )
+
+        palette = nclr.load(read(job.palette))
+        colors = palette.bank(max(job.pal_idx - 1, 0), 1 << image.bitdepth)
+        return (width, height, image.bitdepth, colors, rows)
+
+    def render(self, job: Job) -> bytes:
+        """
+        Produce the contents of a job's output in memory, without writing anything.
+
+        Arguments:
+        job -- the conversion to render
+        """
+        match job:
+            case NCGRToPNG():
+                return png.encode_indexed(*self.image(job))
+            case NCLRToPAL():
+                return nclr.load(read(job.source)).to_jasc(job.bitdepth)
+            case NCERToJSON():
+                return ncer.to_json(read(job.source)).encode("utf-8")
+            case NANRToJSON():
+                return nanr.to_json(read(job.source)).encode("utf-8")
+
+    def convert_batch(
+        self,
+        jobs: typing.Iterable[Job],
+        workers: int = 1,
+        on_done: typing.Callable[[Job, tools.Result], None] | None = None,
+    ) -> list[tools.Result]:
+        """
+        Run a batch of conversion jobs, distributing them across `workers` processes.
+
+        Palettes are parsed at most once per process, no matter how many jobs share them.
+        """
+        if workers <= 1:
+            return super().convert_batch(jobs, workers, on_done)
+
+        # Submit jobs in chunks, enough to keep every worker busy without paying for a round trip
+        # to the pool on every image. Only a few chunks per worker are in flight at once, so jobs
+        # are taken from `jobs` as the pool frees up.
+        size = CHUNK_SIZE
+        if isinstance(jobs, typing.Sized):
+            size = max(1, len(jobs) // (workers * 8))
+
+        pending = iter(jobs)
+        results: list[tools.Result] = []
+        tracer = tracing.active()
+        trace = tracer is not None
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            in_flight: dict[concurrent.futures.Future, tuple[int, list[Job]]] = {}
+
+            def submit() -> bool:
+                chunk = list(itertools.islice(pending, size))
+                if chunk:
+                    future = pool.submit(self._convert_chunk, chunk, trace)
+                    in_flight[future] = (len(results), chunk)
+                    results.extend([tools.Result.SUCCESS] * len(chunk))
+
+                return bool(chunk)
+
+            try:
+                while len(in_flight) < workers * 2 and submit():
+                    pass
+
+                while in_flight:
+                    (done, _) = concurrent.futures.wait(
+                        in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        (chunk_results, events) = future.result()
+                        if tracer:
+                            tracer.extend(events)
+
+                        (start, chunk) = in_flight.pop(future)
+                        results[start : start + len(chunk_results)] = chunk_results
+                        if on_done:
+                            for job, result in zip(chunk, chunk_results):
+                                on_done(job, result)
+
+                        submit()
+            except BaseException:
+                pool.shutdown(cancel_futures=True)
+                raise
+
+        return results
+
+    def _convert_chunk(self, jobs: list[Job], trace: bool) -> tuple[list[tools.Result], list[dict]]:
+        # Spans recorded in a worker process are handed back for the parent to merge.
+        tracer = tracing.enable() if trace else None
+        results = [self.convert(job) for job in jobs]
+        return (results, tracer.events if tracer else [])
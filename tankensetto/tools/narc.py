@@ -18,9 +18,14 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import abc
+import asyncio
 import pathlib
+import struct
+import threading
+import typing
 
-from tankensetto import tools
+from tankensetto import tools, tracing
+from tankensetto.tools import nitrofs
 
 
 class NARC(abc.ABC):
@@ -30,7 +35,11 @@ class NARC(abc.ABC):
 
     @abc.abstractmethod
     def unpack(
-        self, path_to_narc: pathlib.Path, unpack_dir: pathlib.Path, force: bool
+        self,
+        path_to_narc: pathlib.Path,
+        unpack_dir: pathlib.Path,
+        force: bool,
+        on_member: typing.Callable[[int], None] | None = None,
     ) -> tools.Result:
         """
         Unpack a NARC's contents to the target directory.
@@ -38,9 +47,24 @@ class NARC(abc.ABC):
         Arguments:
         path_to_narc -- path to the NARC file
         unpack_dir -- path to the inflation directory
+        force -- if True, unpack even if the inflation directory already exists
+        on_member -- if given, called with the number of members written so far each time one
+            is written, where the implementation can tell
         """
         pass
 
+    async def unpack_async(
+        self,
+        path_to_narc: pathlib.Path,
+        unpack_dir: pathlib.Path,
+        force: bool = False,
+        on_member: typing.Callable[[int], None] | None = None,
+    ) -> tools.Result:
+        """
+        Awaitable form of `unpack`; by default, runs the unpack on a worker thread.
+        """
+        return await asyncio.to_thread(self.unpack, path_to_narc, unpack_dir, force, on_member)
+
 
 class Knarc(NARC, tools.Tool):
     """
@@ -51,7 +75,11 @@ class Knarc(NARC, tools.Tool):
         super().__init__(pathlib.Path("build/subprojects/knarc/knarc"), parent)
 
     def unpack(
-        self, path_to_narc: pathlib.Path, unpack_dir: pathlib.Path, force: bool = False
+        self,
+        path_to_narc: pathlib.Path,
+        unpack_dir: pathlib.Path,
+        force: bool = False,
+        on_member: typing.Callable[[int], None] | None = None,
     ) -> tools.Result:
         if unpack_dir.exists() and not force:
             return tools.Result.UNPACK_EXISTS
@@ -67,3 +95,185 @@ class Knarc(NARC, tools.Tool):
         )
 
         return tools.Result.SUCCESS
+
+    async def unpack_async(
+        self,
+        path_to_narc: pathlib.Path,
+        unpack_dir: pathlib.Path,
+        force: bool = False,
+        on_member: typing.Callable[[int], None] | None = None,
+    ) -> tools.Result:
+        if unpack_dir.exists() and not force:
+            return tools.Result.UNPACK_EXISTS
+
+        unpack_dir.mkdir(parents=True, exist_ok=True)
+        return tools.Result.of(await self.run_async(["-d", unpack_dir, "-u", path_to_narc]))
+
+
+class NARCArchive:
+    """
+    Parsed view of a NARC's members.
+
+    The BTAF, BTNF, and GMIF chunks are parsed once on construction; members are returned as
+    zero-copy slices of the backing buffer, indexed by member number.
+    """
+
+    def __init__(self, data: bytes | memoryview) -> None:
+        """
+        Constructor.
+
+        Arguments:
+        data -- buffer holding the full NARC file
+        """
+        self.data = memoryview(data)
+        (magic, _, _, _, header_size, num_chunks) = struct.unpack_from("<4sHHIHH", self.data, 0)
+        if magic != b"NARC":
+            raise ValueError(f"not a NARC; bad magic {magic!r}")
+
+        fat: list[tuple[int, int]] = []
+        self.names: dict[pathlib.PurePosixPath, int] = {}
+        gmif = 0
+
+        offset = header_size
+        for _ in range(num_chunks):
+            (chunk_magic, chunk_size) = struct.unpack_from("<4sI", self.data, offset)
+            chunk = self.data[offset + 8 : offset + chunk_size]
+            if chunk_magic == b"BTAF":
+                (count,) = struct.unpack_from("<H", chunk, 0)
+                fat = nitrofs.parse_fat(chunk[4:], count)
+            elif chunk_magic == b"BTNF":
+                self.names = nitrofs.parse_fnt(chunk)
+            elif chunk_magic == b"GMIF":
+                gmif = offset + 8
+
+            offset += chunk_size
+
+        # Start and end of each member, relative to the start of the NARC.
+        self.extents = [(gmif + start, gmif + end) for (start, end) in fat]
+        self.members = [self.data[start:end] for (start, end) in self.extents]
+
+    @classmethod
+    def load(cls, path_to_narc: pathlib.Path) -> "NARCArchive":
+        """
+        Read and parse a NARC file from disk.
+
+        Arguments:
+        path_to_narc -- path to the NARC file
+        """
+        return cls(path_to_narc.read_bytes())
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __getitem__(self, i: int) -> memoryview:
+        return self.members[i]
+
+    def __iter__(self):
+        return iter(self.members)
+
+
+class NativeNARC(NARC):
+    """
+    Implementation of NARC contract which parses archives in-process.
+    """
+
+    def open(self, path_to_narc: pathlib.Path) -> NARCArchive:
+        """
+        Open a NARC for zero-copy access to its members.
+
+        Arguments:
+        path_to_narc -- path to the NARC file
+        """
+        return NARCArchive.load(path_to_narc)
+
+    def unpack(
+        self,
+        path_to_narc: pathlib.Path,
+        unpack_dir: pathlib.Path,
+        force: bool = False,
+        on_member: typing.Callable[[int], None] | None = None,
+    ) -> tools.Result:
+        if unpack_dir.exists() and not force:
+            return tools.Result.UNPACK_EXISTS
+
+        unpack_dir.mkdir(parents=True, exist_ok=True)
+        stem = path_to_narc.stem
+        for i, member in enumerate(self.open(path_to_narc)):
+            tracing.write_bytes(unpack_dir / f"{stem}_{i:08}.bin", member)
+            if on_member:
+                on_member(i + 1)
+
+        return tools.Result.SUCCESS
+
+
+class UnpackedMembers:
+    """
+    Members of a NARC which has been unpacked to a directory, as paths to each member's file.
+    """
+
+    def __init__(self, unpack_dir: pathlib.Path, stem: str) -> None:
+        """
+        Constructor.
+
+        Arguments:
+        unpack_dir -- path to the inflation directory
+        stem -- stem of the NARC's file name, which prefixes each member's file name
+        """
+        self.unpack_dir = unpack_dir
+        self.stem = stem
+
+    def __getitem__(self, i: int) -> pathlib.Path:
+        return self.unpack_dir / f"{self.stem}_{i:08}.bin"
+
+
+class UnpackingMembers(UnpackedMembers):
+    """
+    Members of a NARC which is being unpacked to a directory in the background.
+
+    Looking up a member waits until its file has been written, so that conversions can start on
+    the first members while the rest are still being unpacked.
+    """
+
+    def __init__(self, unpack_dir: pathlib.Path, stem: str) -> None:
+        super().__init__(unpack_dir, stem)
+        self._written = 0
+        self._finished = False
+        self._ready = threading.Condition()
+
+    def written(self, count: int) -> None:
+        """
+        Note that the first `count` members have been written; suits `NARC.unpack`'s `on_member`.
+        """
+        with self._ready:
+            self._written = count
+            self._ready.notify_all()
+
+    def finish(self) -> None:
+        """
+        Note that the unpack is over, whether or not it reported its members as it went.
+        """
+        with self._ready:
+            self._finished = True
+            self._ready.notify_all()
+
+    def __getitem__(self, i: int) -> pathlib.Path:
+        with self._ready:
+            self._ready.wait_for(lambda: self._finished or i < self._written)
+
+        return super().__getitem__(i)
+
+
+class ArchiveMembers:
+    """
+    Members of a NARC held in memory, as the contents of each member.
+    """
+
+    def __init__(self, archive: NARCArchive) -> None:
+        self.archive = archive
+
+    def __getitem__(self, i: int) -> bytes:
+        return bytes(self.archive[i])
+
+
+# Access to a NARC's members as conversion inputs, whether unpacked to disk or held in memory.
+Members = UnpackedMembers | ArchiveMembers
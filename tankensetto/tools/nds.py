@@ -18,9 +18,12 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import abc
+import mmap
 import pathlib
+import struct
 
-from tankensetto import tools
+from tankensetto import tools, tracing
+from tankensetto.tools import nitrofs
 
 
 class NDS(abc.ABC):
@@ -41,6 +44,26 @@ class NDS(abc.ABC):
         """
         pass
 
+    def extract_files(
+        self,
+        path_to_rom: pathlib.Path,
+        unpack_dir: pathlib.Path,
+        paths: list[pathlib.PurePath],
+        force: bool = False,
+    ) -> tools.Result:
+        """
+        Extract only the given files to the target directory, laid out as `extract` would.
+
+        By default, the whole ROM is extracted.
+
+        Arguments:
+        path_to_rom -- path to the ROM file
+        unpack_dir -- path to the inflation directory
+        paths -- paths of the files to extract, relative to the inflation directory
+        force -- if True, files which already exist are extracted again
+        """
+        return self.extract(path_to_rom, unpack_dir, force)
+
 
 class NDSTool(NDS, tools.Tool):
     """
@@ -83,4 +106,255 @@ class NDSTool(NDS, tools.Tool):
         return tools.Result.SUCCESS
 
 
+class NDSImage:
+    """
+    Read-only view of an NDS ROM, backed by an mmap of the ROM file.
+
+    The header, FNT, and FAT are parsed once on construction; every accessor returns a zero-copy
+    memoryview into the mapping. Views must be released before the image is closed.
+    """
+
+    HEADER_SIZE = 0x200
+    NITROCODE = 0xDEC00621
+    BANNER_SIZES = {0x0001: 0x840, 0x0002: 0x940, 0x0003: 0xA40, 0x0103: 0x23C0}
+
+    def __init__(self, path_to_rom: pathlib.Path) -> None:
+        """
+        Constructor.
+
+        Arguments:
+        path_to_rom -- path to the ROM file
+        """
+        self.path = path_to_rom
+        with open(path_to_rom, "rb") as rom:
+            self._mmap = mmap.mmap(rom.fileno(), 0, access=mmap.ACCESS_READ)
+        self.data = memoryview(self._mmap)
+
+        (
+            self.arm9_offset,
+            _,
+            _,
+            self.arm9_size,
+            self.arm7_offset,
+            _,
+            _,
+            self.arm7_size,
+            fnt_offset,
+            fnt_size,
+            fat_offset,
+            fat_size,
+            self.y9_offset,
+            self.y9_size,
+            self.y7_offset,
+            self.y7_size,
+        ) = struct.unpack_from("<16I", self.data, 0x20)
+        (self.banner_offset,) = struct.unpack_from("<I", self.data, 0x68)
+
+        self.fat = nitrofs.parse_fat(self.data[fat_offset : fat_offset + fat_size], fat_size // 8)
+        self.paths = nitrofs.parse_fnt(self.data[fnt_offset : fnt_offset + fnt_size])
+
+    def __enter__(self) -> "NDSImage":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.data.release()
+        self._mmap.close()
+
+    @property
+    def header(self) -> memoryview:
+        return self.data[: self.HEADER_SIZE]
+
+    @property
+    def game_code(self) -> str:
+        """
+        The four-character code identifying the game and region, e.g. "CPUE".
+        """
+        return bytes(self.data[0x0C:0x10]).decode("ascii")
+
+    @property
+    def arm9(self) -> memoryview:
+        """
+        The ARM9 binary, including the trailing nitrocode footer, if present.
+        """
+        size = self.arm9_size
+        (footer,) = struct.unpack_from("<I", self.data, self.arm9_offset + size)
+        if footer == self.NITROCODE:
+            size += 12
+
+        return self.data[self.arm9_offset : self.arm9_offset + size]
+
+    @property
+    def arm7(self) -> memoryview:
+        return self.data[self.arm7_offset : self.arm7_offset + self.arm7_size]
+
+    @property
+    def y9(self) -> memoryview:
+        return self.data[self.y9_offset : self.y9_offset + self.y9_size]
+
+    @property
+    def y7(self) -> memoryview:
+        return self.data[self.y7_offset : self.y7_offset + self.y7_size]
+
+    @property
+    def banner(self) -> memoryview:
+        if self.banner_offset == 0:
+            return self.data[:0]
+
+        (version,) = struct.unpack_from("<H", self.data, self.banner_offset)
+        size = self.BANNER_SIZES.get(version, self.BANNER_SIZES[0x0001])
+        return self.data[self.banner_offset : self.banner_offset + size]
+
+    def extent(self, path: str | pathlib.PurePath) -> tuple[int, int]:
+        """
+        Locate a file of the extracted layout within the ROM.
+
+        Arguments:
+        path -- path to the file relative to an extraction directory, e.g. "arm9.bin",
+            "overlay/overlay_0000.bin", or "filesys/poketool/pokegra/height.narc"
+
+        Returns the file's start and end offsets within the ROM.
+        """
+        match pathlib.PurePosixPath(path).parts:
+            case ("filesys", *rest):
+                return self.fat[self.paths[pathlib.PurePosixPath(*rest)]]
+            case ("overlay", name):
+                return self.fat[int(name.removeprefix("overlay_").removesuffix(".bin"))]
+            case ("header.bin",):
+                return (0, self.HEADER_SIZE)
+            case ("arm9.bin",):
+                return (self.arm9_offset, self.arm9_offset + len(self.arm9))
+            case ("arm7.bin",):
+                return (self.arm7_offset, self.arm7_offset + self.arm7_size)
+            case ("y9.bin",):
+                return (self.y9_offset, self.y9_offset + self.y9_size)
+            case ("y7.bin",):
+                return (self.y7_offset, self.y7_offset + self.y7_size)
+            case ("banner.bin",):
+                return (self.banner_offset, self.banner_offset + len(self.banner))
+
+        raise KeyError(path)
+
+    def overlay_ids(self) -> list[int]:
+        """
+        File IDs of all ARM9 and ARM7 overlays, in table order.
+        """
+        return [
+            struct.unpack_from("<I", table, i + 0x18)[0]
+            for table in (self.y9, self.y7)
+            for i in range(0, len(table), 0x20)
+        ]
+
+    def file_by_id(self, file_id: int) -> memoryview:
+        (start, end) = self.fat[file_id]
+        return self.data[start:end]
+
+    def file(self, path: str | pathlib.PurePath) -> memoryview:
+        """
+        Look up a file in the ROM filesystem by its path.
+
+        Arguments:
+        path -- path to the file, relative to the filesystem root
+        """
+        return self.file_by_id(self.paths[pathlib.PurePosixPath(path)])
+
+
+class NativeNDS(NDS):
+    """
+    Implementation of NDS contract which reads the ROM in-process.
+    """
+
+    def open(self, path_to_rom: pathlib.Path) -> NDSImage:
+        """
+        Open a ROM for zero-copy access to its contents.
+
+        Arguments:
+        path_to_rom -- path to the ROM file
+        """
+        return NDSImage(path_to_rom)
+
+    def extract(
+        self, path_to_rom: pathlib.Path, unpack_dir: pathlib.Path, force: bool = False
+    ) -> tools.Result:
+        if unpack_dir.exists() and not force:
+            return tools.Result.UNPACK_EXISTS
+
+        unpack_dir.mkdir(parents=True, exist_ok=True)
+        with self.open(path_to_rom) as rom:
+            tracing.write_bytes(unpack_dir / "arm9.bin", rom.arm9)
+            tracing.write_bytes(unpack_dir / "arm7.bin", rom.arm7)
+            tracing.write_bytes(unpack_dir / "y9.bin", rom.y9)
+            tracing.write_bytes(unpack_dir / "y7.bin", rom.y7)
+            tracing.write_bytes(unpack_dir / "banner.bin", rom.banner)
+            tracing.write_bytes(unpack_dir / "header.bin", rom.header)
+
+            overlay_dir = unpack_dir / "overlay"
+            overlay_dir.mkdir(exist_ok=True)
+            for file_id in rom.overlay_ids():
+                tracing.write_bytes(
+                    overlay_dir / f"overlay_{file_id:04}.bin", rom.file_by_id(file_id)
+                )
+
+            filesys_dir = unpack_dir / "filesys"
+            for path, file_id in rom.paths.items():
+                dest = filesys_dir / path
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                tracing.write_bytes(dest, rom.file_by_id(file_id))
+
+        return tools.Result.SUCCESS
+
+    def extract_files(
+        self,
+        path_to_rom: pathlib.Path,
+        unpack_dir: pathlib.Path,
+        paths: list[pathlib.PurePath],
+        force: bool = False,
+    ) -> tools.Result:
+        """
+        Extract only the given files, copying each straight from the ROM file to its destination
+        without passing its contents through Python.
+        """
+        with self.open(path_to_rom) as rom:
+            wanted = [(path, rom.extent(path)) for path in paths]
+
+        result = tools.Result.UNPACK_EXISTS
+        with open(path_to_rom, "rb") as src:
+            for path, (start, end) in wanted:
+                dest = unpack_dir / path
+                if dest.exists() and not force:
+                    continue
+
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                with tracing.span(dest.name, "write", path=str(dest), size=end - start):
+                    tools.copy_range(src, dest, start, end - start)
+                result = tools.Result.SUCCESS
+
+        return result
+
+    def read_files(
+        self, path_to_rom: pathlib.Path, paths: list[pathlib.PurePath]
+    ) -> dict[pathlib.PurePath, bytes]:
+        """
+        Read the given files from the ROM into memory, without writing anything to disk.
+
+        Arguments:
+        path_to_rom -- path to the ROM file
+        paths -- paths of the files to read, relative to an extraction directory
+
+        Returns a mapping of each path to the file's contents.
+        """
+        files = {}
+        with self.open(path_to_rom) as rom:
+            for path in paths:
+                (start, end) = rom.extent(path)
+                with tracing.span(path.name, "read", path=str(path), size=end - start):
+                    with rom.data[start:end] as view:
+                        files[path] = bytes(view)
+
+        return files
+
+
 NDSTOOL = NDSTool()
+NATIVE_NDS = NativeNDS()
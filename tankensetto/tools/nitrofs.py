@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import pathlib
+import struct
+
+
+def parse_fat(fat: memoryview | bytes, count: int) -> list[tuple[int, int]]:
+    """
+    Parse a File Allocation Table into a list of (start, end) offset pairs.
+
+    Arguments:
+    fat -- buffer beginning at the first FAT entry
+    count -- number of entries in the table
+    """
+    return list(struct.iter_unpack("<II", fat[: count * 8]))
+
+
+def parse_fnt(fnt: memoryview | bytes) -> dict[pathlib.PurePosixPath, int]:
+    """
+    Parse a File Name Table into a mapping of file paths to file IDs.
+
+    Directories are walked from the root entry; unnamed tables (as are typical of NARCs) yield an
+    empty mapping.
+
+    Arguments:
+    fnt -- buffer beginning at the FNT's main directory table
+    """
+    (_, _, num_dirs) = struct.unpack_from("<IHH", fnt, 0)
+    if num_dirs == 0 or num_dirs > 0x1000:
+        return {}
+
+    paths: dict[pathlib.PurePosixPath, int] = {}
+    pending = [(0, pathlib.PurePosixPath())]
+    while pending:
+        (dir_idx, dir_path) = pending.pop()
+        (sub_offset, file_id, _) = struct.unpack_from("<IHH", fnt, dir_idx * 8)
+
+        pos = sub_offset
+        while (entry_type := fnt[pos]) != 0:
+            name_len = entry_type & 0x7F
+            name = bytes(fnt[pos + 1 : pos + 1 + name_len]).decode("ascii")
+            pos += 1 + name_len
+
+            if entry_type & 0x80:
+                (sub_id,) = struct.unpack_from("<H", fnt, pos)
+                pending.append((sub_id & 0x0FFF, dir_path / name))
+                pos += 2
+            else:
+                paths[dir_path / name] = file_id
+                file_id += 1
+
+    return paths
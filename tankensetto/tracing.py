@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""
+tankensetto - A collection of data-mining utilities for DS Pokémon games.
+Copyright (C) 2024  lhearachel@proton.me
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import collections
+import contextlib
+import json
+import os
+import pathlib
+import threading
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    from rich.table import Table
+
+
+class Tracer:
+    """
+    Recorder of timed spans, written out as Chrome trace events.
+
+    Traces can be loaded in Perfetto (https://ui.perfetto.dev) or chrome://tracing.
+    """
+
+    def __init__(self) -> None:
+        self.events: list[dict] = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name: str, cat: str, **args) -> typing.Iterator[dict]:
+        """
+        Record the time spent in the body of a `with` block.
+
+        The yielded dict is the span's args, which the body may add to.
+
+        Arguments:
+        name -- name of the span
+        cat -- category of the span, e.g. "stage", "tool", or "write"
+        args -- additional details to record with the span
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter_ns()
+            event = {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": start / 1000,
+                "dur": (end - start) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                "args": args,
+            }
+            with self._lock:
+                self.events.append(event)
+
+    def extend(self, events: list[dict]) -> None:
+        """
+        Add events recorded elsewhere, e.g. by a worker process.
+        """
+        with self._lock:
+            self.events.extend(events)
+
+    def write(self, path: pathlib.Path) -> None:
+        """
+        Write all recorded events to a trace file.
+        """
+        with self._lock:
+            trace = {"traceEvents": self.events, "displayTimeUnit": "ms"}
+            path.write_text(json.dumps(trace), encoding="utf-8")
+
+    def summary(self, slowest: int = 10) -> "Table":
+        """
+        Build a table of time spent per category of span, followed by the slowest single spans.
+
+        Arguments:
+        slowest -- number of individual spans to list
+        """
+        from rich.table import Table
+
+        with self._lock:
+            events = list(self.events)
+
+        by_cat: dict[str, list[float]] = collections.defaultdict(list)
+        for event in events:
+            by_cat[event["cat"]].append(event["dur"])
+
+        table = Table(title="Profile")
+        table.add_column("Span")
+        table.add_column("Count", justify="right")
+        table.add_column("Total (ms)", justify="right")
+        table.add_column("Mean (ms)", justify="right")
+        table.add_column("Max (ms)", justify="right")
+
+        for cat, durs in sorted(by_cat.items(), key=lambda kv: -sum(kv[1])):
+            total = sum(durs)
+            table.add_row(
+                f"[bold]{cat}[/]",
+                str(len(durs)),
+                f"{total / 1000:.1f}",
+                f"{total / len(durs) / 1000:.3f}",
+                f"{max(durs) / 1000:.3f}",
+            )
+
+        table.add_section()
+        for event in sorted(events, key=lambda e: -e["dur"])[:slowest]:
+            table.add_row(
+                f"{event['cat']}: {event['name']}",
+                "1",
+                f"{event['dur'] / 1000:.1f}",
+                "",
+                "",
+            )
+
+        return table
+
+
+_tracer: Tracer | None = None
+
+
+def enable() -> Tracer:
+    """
+    Start recording spans in this process, discarding any previously recorded.
+    """
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def active() -> Tracer | None:
+    return _tracer
+
+
+def span(name: str, cat: str, **args) -> typing.ContextManager[dict]:
+    """
+    Record a span with the active tracer; does nothing while tracing is disabled.
+    """
+    if _tracer is None:
+        return contextlib.nullcontext({})
+
+    return _tracer.span(name, cat, **args)
+
+
+def write_bytes(path: pathlib.Path, data: bytes | memoryview) -> None:
+    """
+    Write a file, recording the write as a span.
+    """
+    with span(path.name, "write", path=str(path), size=len(data)):
+        path.write_bytes(data)
+
+
+def write_text(path: pathlib.Path, text: str) -> None:
+    """
+    Write a UTF-8 text file, recording the write as a span.
+    """
+    with span(path.name, "write", path=str(path), size=len(text)):
+        path.write_text(text, encoding="utf-8")
@@ -18,11 +18,20 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import pathlib
-from typing import Literal
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, Literal, TypeVar
 
-from tankensetto import info
+import rich
+
+from tankensetto import cache, info, tools
 from tankensetto.constants import narc_path
-from tankensetto.tools import narc
+from tankensetto.tools import gfx, narc
+
+T = TypeVar("T")
+
+# Number of conversion jobs which may be produced ahead of those being converted.
+PREFETCH = 256
 
 
 def full_stem(path: pathlib.Path) -> pathlib.Path:
@@ -55,28 +64,132 @@ def unpack_narc(
     return contents
 
 
-def unpack_narcs(
+async def unpack_narc_async(
     narc: narc.NARC,
-    paths: list[narc_path.NARCPath],
+    path: narc_path.NARCPath,
     rom_filesys_root: pathlib.Path,
     force: bool = True,
     echo: bool = True,
-) -> dict[narc_path.NARCPath, pathlib.Path]:
+    on_member: Callable[[int], None] | None = None,
+) -> pathlib.Path:
     """
-    Unpack a list of NARCs to contents directories, optionally echoing each result.
+    Awaitable form of `unpack_narc`.
 
-    Returns a mapping of input NARCs to their unpacked contents directories.
+    If given, `on_member` is called with the number of members written so far as each is written.
     """
-    return {np: unpack_narc(narc, np, rom_filesys_root, force, echo) for np in paths}
+    contents = rom_filesys_root / f"{full_stem(path.value)}_contents"
+    unpack_result = await narc.unpack_async(
+        rom_filesys_root / path.value, contents, force, on_member
+    )
 
+    if echo:
+        info.echo_result(unpack_result, path.name, contents.name)
 
-def le_int(b: bytes) -> int:
+    return contents
+
+
+def prefetch(items: Iterable[T], size: int = PREFETCH) -> Iterator[T]:
     """
-    Short stub func to convert bytes to an int from little Endian.
+    Produce items on a background thread, at most `size` ahead of the consumer.
+
+    Producing items then overlaps with consuming them, while the bounded queue between the two
+    keeps a fast producer from holding more than `size` items in memory. Anything the producer
+    raises is raised again to the consumer.
     """
-    return int.from_bytes(b, byteorder="little")
+    done = object()
+    stop = threading.Event()
+    handoff: queue.Queue = queue.Queue(maxsize=size)
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+        except BaseException as e:
+            put((done, e))
+        else:
+            put((done, None))
+
+    producer = threading.Thread(target=produce, name="prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            (item, error) = handoff.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        # Let the producer go if the consumer stops early.
+        stop.set()
+
+
+def convert_batch(
+    gfx: gfx.GFX,
+    jobs: Iterable[gfx.Job],
+    workers: int = 1,
+    conversions: cache.ConversionCache | None = None,
+) -> int:
+    """
+    Submit conversion jobs to a GFX backend as they are produced, tracking progress as jobs
+    finish.
+
+    Jobs may be a generator which waits on its inputs; it is run on a background thread, a bounded
+    number of jobs ahead of the conversions, so that producing jobs overlaps with converting them.
 
+    If a conversion cache is given, jobs whose outputs are already up to date are skipped, and
+    the cache is saved with the results of the jobs which ran.
 
-def sint8(b: int | bytes):
-    i = int(b)
-    return i - 256 if i >= 128 else i
+    Returns the number of jobs produced, whether converted or skipped.
+    """
+    keys: dict[gfx.Job, str] = {}
+    produced = 0
+    skipped = 0
+
+    with info.progress() as p:
+        task = p.add_task("", total=None)
+
+        def stale():
+            nonlocal produced, skipped
+            for job in jobs:
+                produced += 1
+                if conversions is not None:
+                    key = conversions.key(gfx, job)
+                    if conversions.is_fresh(job, key):
+                        skipped += 1
+                        p.advance(task)
+                        continue
+                    keys[job] = key
+                yield job
+
+            p.update(task, total=produced)
+
+        def done(job, result: tools.Result):
+            p.advance(task)
+            if conversions is not None:
+                key = keys.pop(job)
+                if result == tools.Result.SUCCESS:
+                    conversions.record(job, key)
+
+        try:
+            gfx.convert_batch(prefetch(stale()), workers, done)
+        finally:
+            # Conversions which finished are kept even if the batch fails or is interrupted.
+            if conversions is not None:
+                conversions.save()
+
+    if skipped:
+        rich.print(f"[bold cyan]🛈[/] {skipped} of {produced} conversions were up to date; skipped")
+
+    return produced